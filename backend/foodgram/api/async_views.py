@@ -0,0 +1,75 @@
+import asyncio
+import contextvars
+import functools
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+
+READ_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+_executor_lock = threading.Lock()
+
+
+@functools.lru_cache(maxsize=None)
+def _create_executor():
+    return ThreadPoolExecutor(
+        max_workers=settings.ASYNC_READ_THREADS,
+        thread_name_prefix='async-read'
+    )
+
+
+def get_executor():
+    """Пул потоков для чтения, создаётся при первом обращении."""
+    with _executor_lock:
+        return _create_executor()
+
+
+def _render_view(view, request, *args, **kwargs):
+    # Соединения с базой в потоках пула закрываются так же, как в начале и
+    # в конце обычного запроса.
+    close_old_connections()
+    try:
+        response = view(request, *args, **kwargs)
+        if hasattr(response, 'render') and callable(response.render):
+            response.render()
+        return response
+    finally:
+        close_old_connections()
+
+
+async def run_in_pool(func, *args, **kwargs):
+    """
+    Выполняет синхронную `func` в пуле `ASYNC_READ_THREADS` потоков.
+    В Django 3.2 `sync_to_async` выполняет синхронный код в одном потоке
+    на процесс, поэтому запросы чтения передаются в отдельный пул.
+    """
+    context = contextvars.copy_context()
+    return await asyncio.get_running_loop().run_in_executor(
+        get_executor(),
+        functools.partial(context.run, func, *args, **kwargs)
+    )
+
+
+def async_read_view(viewset, actions):
+    """
+    Асинхронное представление для маршрута `viewset` с действиями `actions`:
+    запросы чтения выполняются синхронным представлением DRF в пуле потоков
+    (включая рендеринг ответа), остальные - как обычно в Django.
+    Пока ответ не готов, поток событийного цикла обслуживает другие
+    соединения, медленные клиенты не занимают потоки пула.
+    """
+    view = viewset.as_view(actions)
+
+    async def async_view(request, *args, **kwargs):
+        if request.method in READ_METHODS:
+            return await run_in_pool(
+                _render_view, view, request, *args, **kwargs
+            )
+        return await sync_to_async(view)(request, *args, **kwargs)
+
+    async_view.csrf_exempt = True
+    return async_view
@@ -0,0 +1,17 @@
+import math
+
+PERCENTILES = (50, 90, 99)
+
+
+def percentile(timings, percent):
+    """Перцентиль `percent` отсортированного списка (ближайший ранг)."""
+    rank = max(math.ceil(percent / 100 * len(timings)), 1)
+    return timings[rank - 1]
+
+
+def get_percentiles(timings, digits):
+    """Перцентили `PERCENTILES` отсортированного списка в миллисекундах."""
+    return {
+        f'p{percent}_ms': round(percentile(timings, percent), digits)
+        for percent in PERCENTILES
+    }
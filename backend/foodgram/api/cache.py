@@ -0,0 +1,34 @@
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.core.cache.backends.locmem import LocMemCache
+
+
+class SizeLimitedLocMemCache(LocMemCache):
+    """
+    `LocMemCache`, ограниченный не только количеством записей, но и
+    суммарным размером значений: после записи давно не использованные
+    значения удаляются, пока размер больше `OPTIONS['MAX_SIZE']` байт.
+    Значение больше `MAX_SIZE` не сохраняется.
+    """
+
+    def __init__(self, name, params):
+        super().__init__(name, params)
+        self._max_size = int(params.get('OPTIONS', {}).get('MAX_SIZE', 0))
+
+    def _set(self, key, value, timeout=DEFAULT_TIMEOUT):
+        if not self._max_size:
+            super()._set(key, value, timeout)
+        elif len(value) > self._max_size:
+            # Иначе запись вытеснила бы весь кэш, а затем и себя.
+            self._delete(key)
+        else:
+            super()._set(key, value, timeout)
+            self._evict()
+
+    def _evict(self):
+        # Записей не больше `MAX_ENTRIES`, поэтому размер считается заново.
+        size = sum(map(len, self._cache.values()))
+        while size > self._max_size:
+            # Последними в `_cache` стоят давно не использованные записи.
+            evicted_key, evicted = self._cache.popitem()
+            del self._expire_info[evicted_key]
+            size -= len(evicted)
@@ -0,0 +1,91 @@
+from django.core.files.storage import default_storage
+from drf_extra_fields.fields import Base64FileField, Base64ImageField
+from PIL import Image
+from rest_framework import serializers
+
+
+class StagedBase64ImageField(Base64FileField):
+    """
+    Изображение в base64 для записи. В запросе проверяются только тип и
+    заголовок изображения, полное декодирование, перекодирование и
+    уменьшенные копии выполняются в пуле обработки изображений
+    (`recipes.images`).
+    """
+    ALLOWED_TYPES = Base64ImageField.ALLOWED_TYPES
+    INVALID_FILE_MESSAGE = Base64ImageField.INVALID_FILE_MESSAGE
+    INVALID_TYPE_MESSAGE = Base64ImageField.INVALID_TYPE_MESSAGE
+
+    def get_file_extension(self, filename, decoded_file):
+        return Base64ImageField.get_file_extension(
+            self, filename, decoded_file
+        )
+
+    def to_internal_value(self, data):
+        image_file = super().to_internal_value(data)
+        if image_file is None:
+            return image_file
+        try:
+            # Читается только заголовок; слишком большое изображение
+            # вызывает `DecompressionBombError`.
+            Image.open(image_file)
+        except (OSError, Image.DecompressionBombError):
+            raise serializers.ValidationError(self.INVALID_FILE_MESSAGE)
+        image_file.seek(0)
+        return image_file
+
+
+class RecipeImageField(serializers.Field):
+    """
+    Ссылка на самую лёгкую уменьшенную копию изображения рецепта размера
+    `derivative` (по умолчанию берётся из `image_derivative` контекста, иначе
+    `detail`) в формате, который поддерживают все клиенты (JPEG или PNG).
+    Пока копии не созданы, отдаётся исходное изображение.
+    """
+    FALLBACK_FORMATS = ('jpeg', 'png')
+
+    def __init__(self, derivative=None, **kwargs):
+        self.derivative = derivative
+        kwargs['source'] = '*'
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def get_variants(self, recipe):
+        derivative = self.derivative or self.context.get(
+            'image_derivative', 'detail'
+        )
+        return recipe.image_derivatives.get(derivative) or []
+
+    def build_url(self, name):
+        url = default_storage.url(name)
+        request = self.context.get('request')
+        if request is not None:
+            return request.build_absolute_uri(url)
+        return url
+
+    def to_representation(self, recipe):
+        for variant in self.get_variants(recipe):
+            if variant['format'] in self.FALLBACK_FORMATS:
+                return self.build_url(variant['name'])
+        if recipe.image:
+            return self.build_url(recipe.image.name)
+        return None
+
+
+class RecipeImageVariantsField(RecipeImageField):
+    """
+    Уменьшенные копии изображения рецепта во всех форматах (в том числе
+    WebP) от лёгкой к тяжёлой: `url`, `format`, `width`, `height`. Клиент
+    выбирает поддерживаемый формат, например, в `<picture>`. Пока копии не
+    созданы, список пуст.
+    """
+
+    def to_representation(self, recipe):
+        return [
+            {
+                'url': self.build_url(variant['name']),
+                'format': variant['format'],
+                'width': variant['width'],
+                'height': variant['height'],
+            }
+            for variant in self.get_variants(recipe)
+        ]
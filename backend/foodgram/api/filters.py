@@ -1,30 +1,53 @@
 from django.contrib.auth import get_user_model
+from django.db.models import Exists, F, OuterRef
 from django_filters.rest_framework import FilterSet, filters
 
-from recipes.models import Recipe, Tag
+from recipes.models import Recipe, RecipeTags, Tag
 
 User = get_user_model()
 
+RECIPE_ORDERINGS = {
+    'popular': 'rank__popularity',
+    'trending': 'rank__trending',
+}
+
 
 class AuthorAndTagFilter(FilterSet):
     """
     Фильтр рецептов по тэгам и автору.
-    Фильтрация по тэгу происходит по `slug`;
+    Фильтрация по тэгу происходит по точному совпадению `slug`;
     `is_favorited` фильтрует по рецептам, которые находятся в списке избранных;
     `is_in_shopping_cart` фильтрует по рецептам, ингредиенты которых добавленны
-    в список покупок.
+    в список покупок;
+    `ordering` сортирует по рейтингу: `popular` - по популярности, `trending` -
+    по популярности с затуханием по времени.
     """
     tags = filters.ModelMultipleChoiceFilter(
-        lookup_expr='icontains',
         field_name='tags__slug',
         queryset=Tag.objects.all(),
         to_field_name='slug',
+        method='filter_tags',
     )
     author = filters.ModelChoiceFilter(queryset=User.objects.all())
     is_favorited = filters.BooleanFilter(method='filter_is_favorited')
     is_in_shopping_cart = filters.BooleanFilter(
         method='filter_is_in_shopping_cart'
     )
+    ordering = filters.ChoiceFilter(
+        choices=tuple((value, value) for value in RECIPE_ORDERINGS),
+        method='filter_ordering'
+    )
+
+    def filter_tags(self, queryset, name, value):
+        """
+        Рецепты хотя бы с одним из тэгов. Фильтр через `EXISTS` не
+        размножает строки рецептов и не требует `DISTINCT`.
+        """
+        if not value:
+            return queryset
+        return queryset.filter(Exists(
+            RecipeTags.objects.filter(recipe=OuterRef('pk'), tag__in=value)
+        ))
 
     def filter_is_favorited(self, queryset, name, value):
         if value and self.request.user.is_authenticated:
@@ -36,6 +59,12 @@ class AuthorAndTagFilter(FilterSet):
             return queryset.filter(shopping_carts__user=self.request.user)
         return queryset
 
+    def filter_ordering(self, queryset, name, value):
+        return queryset.order_by(
+            F(RECIPE_ORDERINGS[value]).desc(nulls_last=True),
+            '-pub_date', '-id'
+        )
+
     class Meta:
         model = Recipe
         fields = ('tags', 'author')
@@ -0,0 +1,112 @@
+import sys
+import threading
+
+from bisect import bisect_left
+from collections import defaultdict
+from itertools import chain, islice
+
+from api.reference_data import ingredients_cache
+
+MAX_CHAR = chr(sys.maxunicode)
+# Для запросов не длиннее этого порядок совпадений посчитан заранее.
+SHORT_QUERY_LENGTH = 3
+
+
+class IngredientIndex:
+    """
+    Индекс ингредиентов в памяти процесса для автодополнения по названию.
+    Строится из данных `reference_cache` и перестраивается при смене его
+    версии. Для поиска по вхождению хранится отсортированный список суффиксов
+    названий, а для коротких запросов, которые встречаются в большинстве
+    названий, - уже упорядоченные позиции совпадений, поэтому время поиска
+    с `limit` не зависит от размера таблицы.
+    """
+
+    def __init__(self, reference_cache):
+        self.reference_cache = reference_cache
+        self._lock = threading.Lock()
+        self._index = None
+
+    def _build(self, snapshot):
+        entries = tuple(sorted(
+            snapshot.data,
+            key=lambda entry: (entry['name'].lower(), entry['id'])
+        ))
+        names = tuple(entry['name'].lower() for entry in entries)
+        suffixes = sorted(
+            (name[start:], position)
+            for position, name in enumerate(names)
+            for start in range(1, len(name))
+        )
+        short_matches = defaultdict(list)
+        for position, name in enumerate(names):
+            for substring in {
+                name[start:start + length]
+                for length in range(1, SHORT_QUERY_LENGTH + 1)
+                for start in range(len(name) - length + 1)
+            }:
+                short_matches[substring].append(position)
+        return (
+            snapshot,
+            entries,
+            names,
+            tuple(suffix for suffix, _ in suffixes),
+            tuple(position for _, position in suffixes),
+            {
+                substring: tuple(matches)
+                for substring, matches in short_matches.items()
+            },
+        )
+
+    def _get_index(self):
+        snapshot = self.reference_cache.get_snapshot()
+        index = self._index
+        if index is not None and index[0] is snapshot:
+            return index[1:]
+        with self._lock:
+            if self._index is index:
+                self._index = self._build(snapshot)
+            return self._index[1:]
+
+    def search(self, query, limit=None):
+        """
+        Ингредиенты, в названии которых есть `query`, без учёта регистра.
+        Сначала идут названия, начинающиеся с `query`, затем остальные;
+        внутри каждой группы - по алфавиту.
+        """
+        entries, names, suffixes, positions, short_matches = self._get_index()
+        query = query.lower()
+        upper = query + MAX_CHAR
+        start = bisect_left(names, query)
+        prefix_positions = range(start, bisect_left(names, upper, start))
+        if limit is not None and len(prefix_positions) >= limit:
+            return [entries[position] for position in prefix_positions[:limit]]
+        if len(query) <= SHORT_QUERY_LENGTH:
+            # Названия с префиксом `query` идут в `matches` подряд.
+            matches = short_matches.get(query, ())
+            prefix_start = bisect_left(matches, prefix_positions.start)
+            prefix_stop = prefix_start + len(prefix_positions)
+            substring_positions = (
+                matches[number] for number in chain(
+                    range(prefix_start),
+                    range(prefix_stop, len(matches)),
+                )
+            )
+        else:
+            # Длинная подстрока встречается в немногих названиях.
+            start = bisect_left(suffixes, query)
+            substring_positions = sorted(
+                set(positions[start:bisect_left(suffixes, upper, start)])
+                - set(prefix_positions)
+            )
+        if limit is not None:
+            substring_positions = islice(
+                substring_positions, limit - len(prefix_positions)
+            )
+        return [
+            entries[position]
+            for position in chain(prefix_positions, substring_positions)
+        ]
+
+
+ingredient_index = IngredientIndex(ingredients_cache)
@@ -0,0 +1,334 @@
+import json
+import platform
+import statistics
+import tempfile
+import time
+import tracemalloc
+
+from collections import namedtuple
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api.benchmark import get_percentiles
+from api.shopping_cart import invalidate_shopping_cart
+from recipes.models import Ingredient, Recipe, Tag
+
+User = get_user_model()
+
+# Изображение 1x1 для создания и изменения рецептов.
+IMAGE = (
+    'data:image/gif;base64,R0lGODlhAQABAIAAAAAAAP///yH5BAEAAAAALAAAAAABAAEAAAI'
+    'CRAEAOw=='
+)
+Scenario = namedtuple(
+    'Scenario', ('name', 'method', 'path', 'client', 'data', 'before')
+)
+
+
+def get_benchmark_user():
+    """
+    Пользователь с непустым списком покупок и наибольшим количеством
+    подписок: иначе сценарии списка покупок замеряют пустой список.
+    """
+    user = User.objects.annotate(
+        follows=Count('follower', distinct=True),
+        carts=Count('shopping_carts', distinct=True),
+    ).filter(carts__gt=0).order_by('-follows', '-carts', 'pk').first()
+    if user is None:
+        raise CommandError(
+            'Нет пользователей со списком покупок, наполните базу командой '
+            '`generate_data`'
+        )
+    return user
+
+
+def get_tags_path(slugs, limit=50):
+    """Список рецептов с фильтром по нескольким тэгам."""
+    query = urlencode([('tags', slug) for slug in slugs] + [('limit', limit)])
+    return f'/api/recipes/?{query}'
+
+
+def get_recipe_data(tags, ingredients, name):
+    return {
+        'name': name,
+        'text': 'Рецепт для замера производительности',
+        'cooking_time': 30,
+        'image': IMAGE,
+        'tags': tags,
+        'ingredients': [
+            {'id': ingredient, 'amount': 10 * number}
+            for number, ingredient in enumerate(ingredients, start=1)
+        ],
+    }
+
+
+def get_scenarios(user):
+    """Сценарии замера: запросы к самым нагруженным адресам API."""
+    anonymous = APIClient()
+    client = APIClient()
+    client.credentials(
+        HTTP_AUTHORIZATION=f'Token {Token.objects.get_or_create(user=user)[0]}'
+    )
+    tags = list(Tag.objects.values_list('pk', flat=True)[:2])
+    tag_slugs = list(
+        Tag.objects.order_by('pk').values_list('slug', flat=True)[:10]
+    )
+    tag_slug = tag_slugs[0] if tag_slugs else None
+    ingredients = list(Ingredient.objects.values_list('pk', flat=True)[:6])
+    ingredient_name = Ingredient.objects.values_list(
+        'name', flat=True
+    ).first() or ''
+    recipe = Recipe.objects.order_by('-favorites_count', 'pk').first()
+    response = client.post(
+        '/api/recipes/',
+        get_recipe_data(tags, ingredients, 'Рецепт для изменения'),
+        format='json'
+    )
+    if response.status_code != 201:
+        raise CommandError(
+            f'Не удалось создать рецепт для замера: {response.data}'
+        )
+    own_recipe = response.data['id']
+    scenarios = [
+        ('recipes_list_anonymous', 'get', '/api/recipes/', anonymous),
+        ('recipes_list', 'get', '/api/recipes/', client),
+        ('recipes_list_tags', 'get', f'/api/recipes/?tags={tag_slug}',
+         client),
+        # Фильтр по нескольким тэгам (`EXISTS` по `RecipeTags`), на
+        # наборе `generate_data -s 100k` с 10 тэгами.
+        ('recipes_list_tags_1', 'get', get_tags_path(tag_slugs[:1]), client),
+        ('recipes_list_tags_5', 'get', get_tags_path(tag_slugs[:5]), client),
+        ('recipes_list_tags_10', 'get', get_tags_path(tag_slugs), client),
+        ('recipes_list_author', 'get', f'/api/recipes/?author={user.pk}',
+         client),
+        ('recipes_list_is_favorited', 'get',
+         '/api/recipes/?is_favorited=1', client),
+        ('recipes_list_is_in_shopping_cart', 'get',
+         '/api/recipes/?is_in_shopping_cart=1', client),
+        ('recipes_list_popular', 'get', '/api/recipes/?ordering=popular',
+         client),
+        ('recipes_list_trending', 'get', '/api/recipes/?ordering=trending',
+         client),
+        ('recipes_list_cursor', 'get', '/api/recipes/?cursor=', client),
+    ]
+    if recipe is not None:
+        scenarios += [
+            ('recipe_retrieve_anonymous', 'get',
+             f'/api/recipes/{recipe.pk}/', anonymous),
+            ('recipe_retrieve', 'get', f'/api/recipes/{recipe.pk}/', client),
+        ]
+    scenarios = [
+        Scenario(name, method, path, scenario_client, None, None)
+        for name, method, path, scenario_client in scenarios
+    ]
+    scenarios += [
+        Scenario(
+            'recipe_create', 'post', '/api/recipes/', client,
+            get_recipe_data(tags, ingredients, 'Новый рецепт'), None
+        ),
+        Scenario(
+            'recipe_update', 'patch', f'/api/recipes/{own_recipe}/', client,
+            get_recipe_data(tags[:1], ingredients[::-1][:4], 'Изменённый'),
+            None
+        ),
+        Scenario(
+            'subscriptions', 'get',
+            '/api/users/subscriptions/?recipes_limit=3', client, None, None
+        ),
+        Scenario(
+            'ingredients_search', 'get',
+            f'/api/ingredients/?name={ingredient_name[:3]}', anonymous,
+            None, None
+        ),
+        Scenario(
+            'download_shopping_cart', 'get',
+            '/api/recipes/download_shopping_cart/', client, None, None
+        ),
+        Scenario(
+            'download_shopping_cart_uncached', 'get',
+            '/api/recipes/download_shopping_cart/', client, None,
+            lambda: invalidate_shopping_cart(user.pk)
+        ),
+    ]
+    return scenarios
+
+
+def request(scenario):
+    if scenario.before is not None:
+        scenario.before()
+    response = getattr(scenario.client, scenario.method)(
+        scenario.path, scenario.data, format='json'
+    )
+    # Потоковые ответы отдаются только при чтении содержимого.
+    if response.streaming:
+        b''.join(response.streaming_content)
+    return response
+
+
+def measure(scenario, repeat, warmup):
+    """
+    Замеряет сценарий: задержки по `repeat` запросам, количество SQL
+    запросов и пик выделенной памяти в отдельных прогонах, чтобы
+    `tracemalloc` не искажал задержки.
+    """
+    for _ in range(warmup):
+        request(scenario)
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        response = request(scenario)
+        timings.append((time.perf_counter() - started) * 1000)
+    with CaptureQueriesContext(connection) as queries:
+        request(scenario)
+    # Журнал запросов очищается в начале следующего запроса.
+    query_count = len(queries)
+    tracemalloc.start()
+    try:
+        request(scenario)
+        peak_memory = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    timings.sort()
+    result = {
+        'method': scenario.method.upper(),
+        'path': scenario.path,
+        'status': response.status_code,
+        'repeat': repeat,
+        'min_ms': round(timings[0], 3),
+        'mean_ms': round(statistics.mean(timings), 3),
+        'max_ms': round(timings[-1], 3),
+        'queries': query_count,
+        'peak_memory_bytes': peak_memory,
+    }
+    result.update(get_percentiles(timings, 3))
+    return result
+
+
+def compare(results, baseline, threshold):
+    """
+    Регрессии относительно `baseline`: рост p50/p90 задержки или пика
+    памяти больше чем в `1 + threshold` раз и любой рост числа запросов.
+    """
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        for metric in ('p50_ms', 'p90_ms', 'peak_memory_bytes'):
+            if result[metric] > base[metric] * (1 + threshold):
+                regressions.append(
+                    f'{name}: {metric} {base[metric]} -> {result[metric]}'
+                )
+        if result['queries'] > base['queries']:
+            regressions.append(
+                f'{name}: queries {base["queries"]} -> {result["queries"]}'
+            )
+    return regressions
+
+
+class Command(BaseCommand):
+    help = """
+    Команда для замера производительности API через тестовый клиент Django
+    на наполненной базе (см. `generate_data`). Запросы выполняются от имени
+    пользователя с непустым списком покупок. Все изменения базы во время
+    замера откатываются, загруженные изображения удаляются.
+    Результат - JSON с перцентилями задержки, количеством SQL запросов и
+    пиком выделенной памяти для каждого сценария.
+    Формат команды: `python manage.py api_benchmark *keys`
+    `'-r', '--repeat'` ключ указывает количество замеров каждого сценария;
+    `'-w', '--warmup'` ключ указывает количество запросов для прогрева;
+    `'-s', '--scenario'` ключ оставляет только указанные сценарии;
+    `'-o', '--output'` ключ указывает файл для записи результата;
+    `'-b', '--baseline'` ключ указывает файл с прошлым результатом, команда
+    завершается ошибкой при регрессиях;
+    `'-t', '--threshold'` ключ указывает допустимый относительный рост
+    задержки и памяти.
+    Пример команды: `python manage.py api_benchmark -r 50 -b baseline.json`
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '-r', '--repeat',
+            type=int,
+            default=20,
+            help='takes the number of measurements for each scenario')
+        parser.add_argument(
+            '-w', '--warmup',
+            type=int,
+            default=2,
+            help='takes the number of warmup requests for each scenario')
+        parser.add_argument(
+            '-s', '--scenario',
+            action='append',
+            help='takes the name of a scenario to run, can be repeated')
+        parser.add_argument(
+            '-o', '--output',
+            help='takes the file name to write results to')
+        parser.add_argument(
+            '-b', '--baseline',
+            help='takes the file name of stored results to compare with')
+        parser.add_argument(
+            '-t', '--threshold',
+            type=float,
+            default=0.2,
+            help='takes the allowed relative growth of latency and memory')
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['baseline']:
+            with open(options['baseline'], encoding='utf-8') as baseline_fd:
+                baseline = json.load(baseline_fd)['results']
+        results = {}
+        # Изображения созданных рецептов пишутся во временный каталог:
+        # откат транзакции не удаляет файлы.
+        with tempfile.TemporaryDirectory() as media_root, override_settings(
+            ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'],
+            MEDIA_ROOT=media_root
+        ), transaction.atomic():
+            scenarios = get_scenarios(get_benchmark_user())
+            for scenario in scenarios:
+                if (
+                    options['scenario']
+                    and scenario.name not in options['scenario']
+                ):
+                    continue
+                results[scenario.name] = measure(
+                    scenario, options['repeat'], options['warmup']
+                )
+                self.stderr.write(
+                    f'{scenario.name}: '
+                    f'p50 {results[scenario.name]["p50_ms"]} ms, '
+                    f'{results[scenario.name]["queries"]} queries'
+                )
+            transaction.set_rollback(True)
+        report = {
+            'meta': {
+                'created': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+                'python': platform.python_version(),
+                'database': connection.vendor,
+                'recipes': Recipe.objects.count(),
+            },
+            'results': results,
+        }
+        output = json.dumps(report, ensure_ascii=False, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as output_fd:
+                output_fd.write(output)
+        else:
+            self.stdout.write(output)
+        if baseline is None:
+            return
+        regressions = compare(results, baseline, options['threshold'])
+        for regression in regressions:
+            self.stderr.write(self.style.ERROR(regression))
+        if regressions:
+            raise CommandError(f'{len(regressions)} regressions')
+        self.stderr.write(self.style.SUCCESS('No regressions'))
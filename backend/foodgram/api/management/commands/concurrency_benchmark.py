@@ -0,0 +1,155 @@
+import asyncio
+import json
+import time
+
+from urllib.parse import quote, urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.benchmark import get_percentiles
+
+DEFAULT_PATHS = ('/api/recipes/', '/api/tags/', '/api/ingredients/?name=мол')
+
+
+async def fetch(host, port, path, headers, slow):
+    """
+    Выполняет GET запрос и читает ответ до закрытия соединения.
+    `slow` - пауза в секундах между отправкой строки запроса и заголовков,
+    как у медленного клиента.
+    """
+    started = time.perf_counter()
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        writer.write(f'GET {path} HTTP/1.1\r\n'.encode())
+        await writer.drain()
+        if slow:
+            await asyncio.sleep(slow)
+        writer.write(headers.encode())
+        await writer.drain()
+        status = int((await reader.readline()).split()[1])
+        await reader.read()
+    finally:
+        writer.close()
+    return status, time.perf_counter() - started
+
+
+async def run(url, paths, requests, concurrency, slow, rate, token):
+    """
+    Отправляет `requests` запросов по `paths`, не больше `concurrency`
+    одновременно. При заданном `rate` запросы начинаются равномерно с
+    частотой `rate` в секунду, независимо от ответов сервера.
+    """
+    parts = urlsplit(url)
+    host, port = parts.hostname, parts.port or 80
+    headers = f'Host: {parts.netloc}\r\nConnection: close\r\n'
+    if token:
+        headers += f'Authorization: Token {token}\r\n'
+    headers += '\r\n'
+    paths = [quote(path, safe='/?=&') for path in paths]
+    semaphore = asyncio.Semaphore(concurrency)
+    timings = []
+    errors = 0
+
+    async def worker(number):
+        nonlocal errors
+        if rate:
+            await asyncio.sleep(number / rate)
+        async with semaphore:
+            try:
+                status, elapsed = await fetch(
+                    host, port, paths[number % len(paths)], headers, slow
+                )
+            except (OSError, ValueError, IndexError):
+                errors += 1
+                return
+            if status >= 400:
+                errors += 1
+            timings.append(elapsed * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(number) for number in range(requests)))
+    elapsed = time.perf_counter() - started
+    timings.sort()
+    result = {
+        'requests': requests,
+        'errors': errors,
+        'concurrency': concurrency,
+        'slow_s': slow,
+        'rate': rate,
+        'elapsed_s': round(elapsed, 3),
+        'rps': round(requests / elapsed, 1),
+    }
+    if timings:
+        result.update(get_percentiles(timings, 2))
+    return result
+
+
+class Command(BaseCommand):
+    help = """
+    Команда для сравнения развёртываний WSGI и ASGI под конкурентной
+    нагрузкой: отправляет GET запросы к запущенным серверам и выводит JSON
+    с пропускной способностью и перцентилями задержки для каждого адреса.
+    Формат команды: `python manage.py concurrency_benchmark *keys`
+    `'-u', '--url'` ключ указывает адрес сервера, можно повторять;
+    `'-p', '--path'` ключ указывает путь запроса, можно повторять;
+    `'-n', '--requests'` ключ указывает количество запросов;
+    `'-c', '--concurrency'` ключ указывает количество одновременных запросов;
+    `'-s', '--slow'` ключ указывает паузу медленного клиента в секундах;
+    `'-r', '--rate'` ключ указывает частоту начала запросов в секунду, без
+    него запросы отправляются сразу;
+    `'-t', '--token'` ключ указывает токен пользователя.
+    Пример команды:
+    `python manage.py concurrency_benchmark -u http://127.0.0.1:8000
+    -u http://127.0.0.1:8001 -c 200 -n 2000 -s 0.5 -r 50`
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '-u', '--url',
+            action='append',
+            required=True,
+            help='takes the base url of a running server, can be repeated')
+        parser.add_argument(
+            '-p', '--path',
+            action='append',
+            help='takes the path to request, can be repeated')
+        parser.add_argument(
+            '-n', '--requests',
+            type=int,
+            default=1000,
+            help='takes the total number of requests for each url')
+        parser.add_argument(
+            '-c', '--concurrency',
+            type=int,
+            default=100,
+            help='takes the number of simultaneous requests')
+        parser.add_argument(
+            '-s', '--slow',
+            type=float,
+            default=0,
+            help='takes the delay of a slow client in seconds')
+        parser.add_argument(
+            '-r', '--rate',
+            type=float,
+            default=0,
+            help='takes the number of requests started per second')
+        parser.add_argument(
+            '-t', '--token',
+            help='takes the authentication token')
+
+    def handle(self, *args, **options):
+        results = {}
+        for url in options['url']:
+            try:
+                results[url] = asyncio.run(run(
+                    url,
+                    options['path'] or DEFAULT_PATHS,
+                    options['requests'],
+                    options['concurrency'],
+                    options['slow'],
+                    options['rate'],
+                    options['token'],
+                ))
+            except OSError as e:
+                raise CommandError(f'{url}: {e}')
+        self.stdout.write(json.dumps(results, ensure_ascii=False, indent=2))
@@ -0,0 +1,48 @@
+import statistics
+import timeit
+
+from django.core.management.base import BaseCommand
+
+from api.shopping_cart import SHOPPING_CART_FORMATS
+
+
+class Command(BaseCommand):
+    help = """
+    Команда для сравнения времени рендеринга списка покупок в разных форматах.
+    Формат команды: `python manage.py shopping_cart_benchmark *keys`
+    `'-i', '--items'` ключ указывает количество ингредиентов в списке;
+    `'-r', '--repeat'` ключ указывает количество замеров каждого формата.
+    Пример команды для списка из 300 ингредиентов:
+    `python manage.py shopping_cart_benchmark -i 300 -r 20`
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '-i', '--items',
+            type=int,
+            default=300,
+            help='takes the number of ingredients in the shopping cart')
+        parser.add_argument(
+            '-r', '--repeat',
+            type=int,
+            default=10,
+            help='takes the number of measurements for each format')
+
+    def handle(self, *args, **options):
+        items = [
+            {'name': f'Ингредиент {i}', 'unit': 'г', 'amount': i}
+            for i in range(1, options['items'] + 1)
+        ]
+        for export_format, (_, stream) in SHOPPING_CART_FORMATS.items():
+            size = len(b''.join(stream(items)))
+            timings = timeit.repeat(
+                lambda: b''.join(stream(items)),
+                number=1,
+                repeat=options['repeat']
+            )
+            self.stdout.write(
+                f'{export_format:>5}: '
+                f'min {min(timings) * 1000:.2f} ms, '
+                f'median {statistics.median(timings) * 1000:.2f} ms, '
+                f'{size} bytes'
+            )
@@ -0,0 +1,222 @@
+import asyncio
+import json
+import logging
+import random
+import re
+import time
+
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+logger = logging.getLogger(__name__)
+
+# Списки параметров `IN (%s, %s, ...)` и строки `VALUES` разной длины
+# считаются одним запросом.
+PLACEHOLDERS = re.compile(r'\(\s*%s(?:\s*,\s*%s)*\s*\)')
+
+
+def get_fingerprint(sql):
+    return PLACEHOLDERS.sub('(...)', sql)
+
+
+class RequestProfile:
+    """
+    Замеры одного запроса: количество и время SQL запросов по отпечаткам,
+    время сериализации и рендеринга ответа. Подключается к соединениям с
+    базой как `execute_wrapper`.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = Counter()
+        self.sql_time = 0.0
+        self.serialize_time = 0.0
+        self.render_started = None
+        self.render_time = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_time += time.perf_counter() - started
+            self.queries[get_fingerprint(sql)] += 1
+
+    def timed(self, method):
+        """Оборачивает `method`, добавляя время вызова к сериализации."""
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                self.serialize_time += time.perf_counter() - started
+        return wrapper
+
+    def start_render(self):
+        self.render_started = time.perf_counter()
+
+    def finish_render(self, response):
+        if self.render_started is not None:
+            self.render_time = time.perf_counter() - self.render_started
+
+    @property
+    def duplicates(self):
+        """Отпечатки запросов, выполненных больше одного раза."""
+        return [
+            (sql, count) for sql, count in self.queries.most_common()
+            if count > 1
+        ]
+
+    def server_timing(self, total):
+        query_count = sum(self.queries.values())
+        return ', '.join((
+            f'db;dur={self.sql_time * 1000:.1f};desc="{query_count} queries"',
+            f'serialize;dur={self.serialize_time * 1000:.1f}',
+            f'render;dur={self.render_time * 1000:.1f}',
+            f'total;dur={total * 1000:.1f}',
+        ))
+
+    def as_dict(self, total):
+        return {
+            'queries': sum(self.queries.values()),
+            'sql_ms': round(self.sql_time * 1000, 2),
+            'serialize_ms': round(self.serialize_time * 1000, 2),
+            'render_ms': round(self.render_time * 1000, 2),
+            'total_ms': round(total * 1000, 2),
+            'duplicates': [
+                {'sql': sql, 'count': count}
+                for sql, count in self.duplicates
+            ],
+        }
+
+
+_current_profile = ContextVar('request_profile', default=None)
+
+
+def execute_profiled(execute, sql, params, many, context):
+    """`execute_wrapper` всех соединений: передаёт запрос в текущий замер."""
+    profile = _current_profile.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+    return profile(execute, sql, params, many, context)
+
+
+@receiver(connection_created)
+def install_execute_wrapper(sender, connection, **kwargs):
+    """
+    Соединения в Django свои у каждого потока, поэтому замер подключается
+    к каждому соединению при открытии, а текущий замер передаётся через
+    контекст: `sync_to_async` и пул `api.async_views` копируют его в поток,
+    где выполняется представление.
+    """
+    if execute_profiled not in connection.execute_wrappers:
+        connection.execute_wrappers.append(execute_profiled)
+
+
+@contextmanager
+def profile_queries(profile):
+    """Запросы к базе внутри блока и в его контексте замеряет `profile`."""
+    token = _current_profile.set(profile)
+    try:
+        yield
+    finally:
+        _current_profile.reset(token)
+
+
+class RequestProfilingMiddleware:
+    """
+    Замеряет долю запросов `REQUEST_PROFILING_SAMPLE_RATE`: добавляет
+    заголовок `Server-Timing` и пишет строку JSON в журнал `api.profiling`.
+    Если отпечаток SQL запроса повторяется не меньше
+    `REQUEST_PROFILING_DUPLICATE_THRESHOLD` раз (N+1), строка пишется с
+    уровнем WARNING. При нулевой доле middleware отключается.
+    Работает и в синхронной, и в асинхронной цепочке middleware, чтобы под
+    ASGI запросы не выполнялись по одному в общем потоке.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.sample_rate = settings.REQUEST_PROFILING_SAMPLE_RATE
+        if self.sample_rate <= 0:
+            raise MiddlewareNotUsed
+        self.duplicate_threshold = (
+            settings.REQUEST_PROFILING_DUPLICATE_THRESHOLD
+        )
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            # Так Django определяет асинхронные middleware.
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self):
+            return self.__acall__(request)
+        if random.random() >= self.sample_rate:
+            return self.get_response(request)
+        profile = request.profile = RequestProfile()
+        with profile_queries(profile):
+            response = self.get_response(request)
+        return self.log_profile(request, response, profile)
+
+    async def __acall__(self, request):
+        if random.random() >= self.sample_rate:
+            return await self.get_response(request)
+        profile = request.profile = RequestProfile()
+        with profile_queries(profile):
+            response = await self.get_response(request)
+        return self.log_profile(request, response, profile)
+
+    def log_profile(self, request, response, profile):
+        total = time.perf_counter() - profile.started
+        response['Server-Timing'] = profile.server_timing(total)
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'view': getattr(request.resolver_match, 'view_name', None),
+            'status': response.status_code,
+            **profile.as_dict(total),
+        }
+        duplicates = profile.duplicates
+        level = logging.INFO
+        if duplicates and duplicates[0][1] >= self.duplicate_threshold:
+            level = logging.WARNING
+        logger.log(level, json.dumps(record, ensure_ascii=False))
+        return response
+
+
+class ProfilingMixin:
+    """
+    Добавляет в замеры `RequestProfilingMiddleware` время сериализации
+    (вместе с SQL запросами, выполненными при сериализации) и рендеринга
+    ответа. Без замера запрос обрабатывается как обычно.
+    """
+
+    def get_profile(self):
+        return getattr(self.request, 'profile', None)
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        profile = self.get_profile()
+        if profile is not None:
+            serializer.to_representation = profile.timed(
+                serializer.to_representation
+            )
+        return serializer
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(
+            request, response, *args, **kwargs
+        )
+        profile = self.get_profile()
+        if profile is not None and hasattr(
+            response, 'add_post_render_callback'
+        ):
+            profile.start_render()
+            response.add_post_render_callback(profile.finish_render)
+        return response
@@ -1,11 +1,14 @@
 from django.contrib.auth import get_user_model
 from django.db import transaction
-from django.shortcuts import get_object_or_404
-from drf_extra_fields.fields import Base64ImageField
+from django.db.models import Prefetch, prefetch_related_objects
 from rest_framework import serializers
 from rest_framework.validators import UniqueTogetherValidator, UniqueValidator
 
+from api.fields import (
+    RecipeImageField, RecipeImageVariantsField, StagedBase64ImageField,
+)
 from api.user_serializers import CustomUserSerializer, RecipeMinifiedSerializer
+from recipes.images import schedule_image_processing
 from recipes.models import (
     Favorites, Ingredient, IngredientAmount, Recipe, RecipeTags, ShoppingCart,
     Tag,
@@ -71,6 +74,8 @@ class RecipesForReadingSerializer(serializers.ModelSerializer):
     False;
     `is_in_shopping_cart: boolean` - находится ли ингредиенты рецепта в списке
     для покупок.
+    Если в контексте переданы `favorited_ids` и `shopping_cart_ids`, флаги
+    берутся из них без запросов к базе данных.
     """
 
     author = CustomUserSerializer(read_only=True)
@@ -79,7 +84,8 @@ class RecipesForReadingSerializer(serializers.ModelSerializer):
         read_only=True,
         source='ingredient_amounts'
     )
-    image = Base64ImageField()
+    image = RecipeImageField()
+    image_variants = RecipeImageVariantsField()
     tags = TagsSerializer(many=True, read_only=True)
     is_favorited = serializers.SerializerMethodField(
         method_name='get_is_favorited'
@@ -96,11 +102,14 @@ class RecipesForReadingSerializer(serializers.ModelSerializer):
             'is_favorited',
             'is_in_shopping_cart',
             'name', 'text',
-            'image', 'cooking_time',
+            'image', 'image_variants', 'cooking_time',
         )
 
     def get_is_favorited(self, obj):
         """Находится ли рецепт в списке избранном текущего пользователя."""
+        favorited_ids = self.context.get('favorited_ids')
+        if favorited_ids is not None:
+            return obj.id in favorited_ids
         current_user = self.context.get('request').user
         if not current_user.is_authenticated:
             return False
@@ -108,6 +117,9 @@ class RecipesForReadingSerializer(serializers.ModelSerializer):
 
     def get_is_in_shopping_cart(self, obj):
         """Находиться ли рецепт в списке покупок текущего пользователя."""
+        shopping_cart_ids = self.context.get('shopping_cart_ids')
+        if shopping_cart_ids is not None:
+            return obj.id in shopping_cart_ids
         current_user = self.context.get('request').user
         if not current_user.is_authenticated:
             return False
@@ -124,7 +136,7 @@ class RecipesForWritingSerializer(serializers.ModelSerializer):
         many=True,
         queryset=Tag.objects,
     )
-    image = Base64ImageField()
+    image = StagedBase64ImageField()
     is_favorited = serializers.SerializerMethodField(
         method_name='get_is_favorited'
     )
@@ -156,6 +168,16 @@ class RecipesForWritingSerializer(serializers.ModelSerializer):
             return False
         return current_user.shopping_carts.filter(recipe=obj).exists()
 
+    def to_representation(self, instance):
+        prefetch_related_objects(
+            (instance,),
+            Prefetch(
+                'ingredient_amounts',
+                queryset=IngredientAmount.objects.select_related('ingredient')
+            ),
+        )
+        return super().to_representation(instance)
+
     def validate(self, data):
         ingredients = data.get('ingredient_amounts')
         if ingredients is None:
@@ -170,6 +192,16 @@ class RecipesForWritingSerializer(serializers.ModelSerializer):
                     'Проверьте, что ингредиенты не повторяются'
                 )
             ingredient_set.add(ingredient_id)
+        missing_ids = ingredient_set.difference(
+            Ingredient.objects.filter(
+                id__in=ingredient_set
+            ).values_list('id', flat=True)
+        )
+        if missing_ids:
+            raise serializers.ValidationError(
+                'Ингредиентов с id '
+                f'{", ".join(map(str, sorted(missing_ids)))} не существует'
+            )
         return data
 
     def _write_tags(self, recipe, tags):
@@ -178,16 +210,64 @@ class RecipesForWritingSerializer(serializers.ModelSerializer):
         RecipeTags.objects.bulk_create(recipe_tags)
 
     def _write_ingredients(self, recipe, ingredients):
-        for ingredient in ingredients:
-            current_ingredient = get_object_or_404(
-                Ingredient,
-                id=ingredient.get('ingredient').get('id')
-            )
-            IngredientAmount.objects.create(
+        ingredient_amounts = (
+            IngredientAmount(
                 recipe=recipe,
-                ingredient=current_ingredient,
+                ingredient_id=ingredient.get('ingredient').get('id'),
                 amount=ingredient.get('amount')
             )
+            for ingredient in ingredients
+        )
+        IngredientAmount.objects.bulk_create(ingredient_amounts)
+
+    def _update_tags(self, recipe, tags):
+        """Удаляет снятые и добавляет новые тэги, остальные не трогает."""
+        tag_ids = {tag.id for tag in tags}
+        current_tag_ids = set(
+            recipe.recipe_tags.values_list('tag_id', flat=True)
+        )
+        removed_tag_ids = current_tag_ids - tag_ids
+        if removed_tag_ids:
+            recipe.recipe_tags.filter(tag_id__in=removed_tag_ids).delete()
+        RecipeTags.objects.bulk_create(
+            RecipeTags(recipe=recipe, tag_id=tag_id)
+            for tag_id in tag_ids - current_tag_ids
+        )
+
+    def _update_ingredients(self, recipe, ingredients):
+        """
+        Удаляет убранные ингредиенты, добавляет новые и обновляет количество
+        изменившихся; неизменённые строки не трогает.
+        """
+        amounts = {
+            ingredient.get('ingredient').get('id'): ingredient.get('amount')
+            for ingredient in ingredients
+        }
+        current_amounts = {
+            ingredient_amount.ingredient_id: ingredient_amount
+            for ingredient_amount in recipe.ingredient_amounts.all()
+        }
+        removed_ids = current_amounts.keys() - amounts.keys()
+        if removed_ids:
+            recipe.ingredient_amounts.filter(
+                ingredient_id__in=removed_ids
+            ).delete()
+        changed_amounts = []
+        for ingredient_id, ingredient_amount in current_amounts.items():
+            amount = amounts.get(ingredient_id)
+            if amount is not None and ingredient_amount.amount != amount:
+                ingredient_amount.amount = amount
+                changed_amounts.append(ingredient_amount)
+        if changed_amounts:
+            IngredientAmount.objects.bulk_update(changed_amounts, ('amount',))
+        IngredientAmount.objects.bulk_create(
+            IngredientAmount(
+                recipe=recipe,
+                ingredient_id=ingredient_id,
+                amount=amounts[ingredient_id]
+            )
+            for ingredient_id in amounts.keys() - current_amounts.keys()
+        )
 
     @transaction.atomic
     def create(self, validated_data):
@@ -196,17 +276,20 @@ class RecipesForWritingSerializer(serializers.ModelSerializer):
         recipe = Recipe.objects.create(**validated_data)
         self._write_tags(recipe, tags)
         self._write_ingredients(recipe, ingredients)
+        schedule_image_processing(recipe)
         return recipe
 
     @transaction.atomic
     def update(self, recipe, validated_data):
         tags = validated_data.pop('tags')
         ingredients = validated_data.pop('ingredient_amounts')
+        if 'image' in validated_data:
+            validated_data['image_derivatives'] = {}
         recipe = super().update(recipe, validated_data)
-        recipe.tags.clear()
-        recipe.ingredients.clear()
-        self._write_tags(recipe, tags)
-        self._write_ingredients(recipe, ingredients)
+        self._update_tags(recipe, tags)
+        self._update_ingredients(recipe, ingredients)
+        if 'image' in validated_data:
+            schedule_image_processing(recipe)
         return recipe
 
 
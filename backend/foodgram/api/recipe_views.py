@@ -1,50 +1,130 @@
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.exceptions import ObjectDoesNotExist
-from django.db.models import F, Sum
-from django.http import HttpResponse
+from django.db import transaction
+from django.db.models import Prefetch
+from django.http import HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response, patch_cache_control
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework import filters, permissions, status
+from rest_framework import permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 from rest_framework.viewsets import ModelViewSet, ReadOnlyModelViewSet
 
 from api.filters import AuthorAndTagFilter
+from api.ingredient_index import ingredient_index
+from api.profiling import ProfilingMixin
 from api.recipe_serializers import (
     FavoritesSerializer, IngredientsSerializer, RecipesForReadingSerializer,
     RecipesForWritingSerializer, ShoppingCartSerializer, TagsSerializer,
 )
-from api.utilits import LimitPagePagination, get_shopping_cart_pdf
-from recipes.models import Favorites, Ingredient, Recipe, ShoppingCart, Tag
+from api.reference_data import (
+    ReferenceDataMixin, ingredients_cache, tags_cache,
+)
+from api.shopping_cart import (
+    DEFAULT_SHOPPING_CART_FORMAT, SHOPPING_CART_FORMATS, cache_shopping_cart,
+    get_cached_shopping_cart, get_shopping_cart_fingerprint,
+    get_shopping_cart_items,
+)
+from api.utilits import (
+    IgnoreFormatContentNegotiation, KeysetPaginationMixin, LimitPagePagination,
+    get_recipes_flags,
+)
+from recipes.models import (
+    Favorites, Ingredient, IngredientAmount, Recipe, ShoppingCart, Tag,
+)
 from users.permissions import AuthorOrReadOnly
 
-CONTENT_TYPE = 'application/pdf'
 User = get_user_model()
 
 
-class TagsViewSet(ReadOnlyModelViewSet):
+class TagsViewSet(ReferenceDataMixin, ReadOnlyModelViewSet):
     """Представление тэгов рецептов."""
     serializer_class = TagsSerializer
     queryset = Tag.objects.all()
+    reference_cache = tags_cache
 
 
-class IngredientsViewSet(ReadOnlyModelViewSet):
+class IngredientsViewSet(ReferenceDataMixin, ReadOnlyModelViewSet):
     """Представление иногредиентов рецептов."""
     serializer_class = IngredientsSerializer
     queryset = Ingredient.objects.all()
-    filter_backends = (filters.SearchFilter,)
-    search_fields = ('name',)
+    reference_cache = ingredients_cache
+
+    def list(self, request, *args, **kwargs):
+        """
+        Список ингредиентов.
+        `name` - поиск по названию для автодополнения: сначала ингредиенты,
+        название которых начинается с `name`, затем содержащие `name`;
+        `limit` - максимальное количество ингредиентов в выдаче поиска.
+        """
+        name = request.query_params.get(api_settings.SEARCH_PARAM)
+        if not name:
+            return super().list(request, *args, **kwargs)
+        limit = request.query_params.get('limit')
+        limit = int(limit) if limit and limit.isdigit() else None
+        return Response(ingredient_index.search(name, limit))
 
 
-class RecipesViewSet(ModelViewSet):
-    """Представление рецептов."""
+class RecipesViewSet(ProfilingMixin, KeysetPaginationMixin, ModelViewSet):
+    """
+    Представление рецептов.
+    С параметром `cursor` список отдаётся с паджинацией по ключу
+    (`pub_date`, `id`), если не задан параметр `ordering`.
+    """
 
     queryset = Recipe.objects.all()
     pagination_class = LimitPagePagination
     permission_classes = (AuthorOrReadOnly,)
     filter_backends = (DjangoFilterBackend,)
     filterset_class = AuthorAndTagFilter
+    reading_select_related = ('author',)
+    reading_prefetch_related = (
+        'tags',
+        Prefetch(
+            'ingredient_amounts',
+            queryset=IngredientAmount.objects.select_related('ingredient')
+        ),
+    )
+
+    @property
+    def keyset_ordering(self):
+        """С сортировкой по рейтингу используется страничная паджинация."""
+        if 'ordering' in self.request.query_params:
+            return None
+        return ('-pub_date', '-id')
+
+    def get_queryset(self):
+        """
+        Для действий `retrieve, list` подгружает автора, тэги и ингредиенты
+        рецептов, чтобы число запросов не зависело от размера страницы.
+        """
+        queryset = super().get_queryset()
+        if self.action in ('retrieve', 'list'):
+            return queryset.select_related(
+                *self.reading_select_related
+            ).prefetch_related(*self.reading_prefetch_related)
+        return queryset
+
+    def list(self, request, *args, **kwargs):
+        """
+        Список рецептов.
+        Флаги `is_favorited`, `is_in_shopping_cart` и `is_subscribed` для всей
+        страницы вычисляются заранее фиксированным числом запросов;
+        изображения отдаются уменьшенными копиями `thumbnail`.
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        recipes = list(queryset) if page is None else page
+        context = self.get_serializer_context()
+        context.update(get_recipes_flags(request.user, recipes))
+        context['image_derivative'] = 'thumbnail'
+        serializer = self.get_serializer(recipes, many=True, context=context)
+        if page is None:
+            return Response(serializer.data)
+        return self.get_paginated_response(serializer.data)
 
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
@@ -59,6 +139,7 @@ class RecipesViewSet(ModelViewSet):
         methods=('post',),
         permission_classes=(permissions.IsAuthenticated,),
     )
+    @transaction.atomic
     def favorite(self, request, pk):
         """
         Добавление рецепта в список избранных рецептов.
@@ -75,6 +156,7 @@ class RecipesViewSet(ModelViewSet):
         )
 
     @favorite.mapping.delete
+    @transaction.atomic
     def unfavorite(self, request, pk):
         """
         Удаление рецепта из списока избранных рецептов.
@@ -98,6 +180,7 @@ class RecipesViewSet(ModelViewSet):
         detail=True,
         permission_classes=(permissions.IsAuthenticated,),
     )
+    @transaction.atomic
     def shopping_cart(self, request, pk):
         """
         Добавление(удаление) ингредиентов рецепта в(из) список(ка) покупок.
@@ -111,6 +194,7 @@ class RecipesViewSet(ModelViewSet):
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
     @shopping_cart.mapping.delete
+    @transaction.atomic
     def del_from_shopping_cart(self, request, pk):
         """
         Удаление ингредиентов рецепта из списока покупок.
@@ -129,16 +213,50 @@ class RecipesViewSet(ModelViewSet):
 
     @action(
         detail=False,
-        permission_classes=(permissions.IsAuthenticated,)
+        permission_classes=(permissions.IsAuthenticated,),
+        content_negotiation_class=IgnoreFormatContentNegotiation,
     )
     def download_shopping_cart(self, request):
-        """Скачивание списка покупок."""
-        shopping_cart_queryset = request.user.shopping_carts.values(
-            name=F('recipe__ingredient_amounts__ingredient__name'),
-            unit=F('recipe__ingredient_amounts__ingredient__measurement_unit')
-        ).annotate(amount=Sum('recipe__ingredient_amounts__amount'))
-        response = HttpResponse(content_type=CONTENT_TYPE)
+        """
+        Скачивание списка покупок.
+        `format` - формат файла: `pdf` (по умолчанию), `txt`, `csv`, `json`.
+        Файл кэшируется по содержимому списка покупок, ответ содержит `ETag`,
+        при совпадении `If-None-Match` возвращается `304 Not Modified`.
+        """
+        export_format = request.query_params.get(
+            'format', DEFAULT_SHOPPING_CART_FORMAT
+        )
+        if export_format not in SHOPPING_CART_FORMATS:
+            return Response(
+                data={'errors': (
+                    'Доступные форматы: '
+                    f'{", ".join(SHOPPING_CART_FORMATS)}.'
+                )},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        content_type, stream = SHOPPING_CART_FORMATS[export_format]
+        items = get_shopping_cart_items(request.user)
+        fingerprint = get_shopping_cart_fingerprint(items, export_format)
+        etag = f'"{fingerprint}"'
+        response = get_conditional_response(request, etag=etag)
+        if response is not None:
+            return response
+        body = get_cached_shopping_cart(request.user.id, fingerprint)
+        if body is not None:
+            response = HttpResponse(body, content_type=content_type)
+        else:
+            response = StreamingHttpResponse(
+                cache_shopping_cart(
+                    request.user.id,
+                    export_format,
+                    fingerprint,
+                    stream(items)
+                ),
+                content_type=content_type
+            )
+        response['ETag'] = etag
         response['Content-Disposition'] = (
-            f'attachment; filename={settings.UPLOAD_FILE_NAME}'
+            f'attachment; filename={settings.UPLOAD_FILE_NAME}.{export_format}'
         )
-        return get_shopping_cart_pdf(shopping_cart_queryset, response)
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
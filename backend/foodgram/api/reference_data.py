@@ -0,0 +1,119 @@
+import threading
+import uuid
+
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import Http404, HttpResponse
+from rest_framework.renderers import JSONRenderer
+
+from api.recipe_serializers import IngredientsSerializer, TagsSerializer
+from api.replication import use_primary
+from recipes.models import Ingredient, Tag
+
+ReferenceDataSnapshot = namedtuple(
+    'ReferenceDataSnapshot', ('version', 'data', 'list_body', 'item_bodies')
+)
+
+
+class ReferenceDataCache:
+    """
+    Кэш справочника в памяти процесса.
+    Хранит сериализованные данные и готовые JSON ответы для списка и для
+    каждого объекта. Актуальность проверяется по версии в общем для всех
+    процессов кэше `REFERENCE_DATA_VERSION_CACHE`, версия меняется
+    сигналами при сохранении и удалении объектов модели.
+    """
+
+    def __init__(self, name, model, serializer_class):
+        self.name = name
+        self.model = model
+        self.serializer_class = serializer_class
+        self._lock = threading.Lock()
+        self._snapshot = None
+
+    @property
+    def _version_key(self):
+        return f'reference_data:{self.name}'
+
+    @staticmethod
+    def _new_version():
+        return uuid.uuid4().hex
+
+    def get_version(self):
+        return caches[settings.REFERENCE_DATA_VERSION_CACHE].get_or_set(
+            self._version_key, self._new_version
+        )
+
+    def invalidate(self):
+        """
+        Меняет версию справочника во всех процессах. Версия - новое
+        уникальное значение, а не увеличенное старое: `incr` файлового кэша
+        не атомарен, и две одновременные смены могли дать одну версию.
+        """
+        caches[settings.REFERENCE_DATA_VERSION_CACHE].set(
+            self._version_key, self._new_version()
+        )
+
+    def _build(self, version):
+        renderer = JSONRenderer()
+        # Снимок хранится до смены версии, поэтому строится по основной
+        # базе, а не по реплике с задержкой.
+        with use_primary():
+            data = self.serializer_class(
+                self.model.objects.all(), many=True
+            ).data
+        return ReferenceDataSnapshot(
+            version=version,
+            data=data,
+            list_body=renderer.render(data),
+            item_bodies={item['id']: renderer.render(item) for item in data},
+        )
+
+    def get_snapshot(self):
+        version = self.get_version()
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.version == version:
+            return snapshot
+        with self._lock:
+            if self._snapshot is snapshot:
+                self._snapshot = self._build(version)
+            return self._snapshot
+
+    def get_item_body(self, pk):
+        try:
+            pk = int(pk)
+        except (TypeError, ValueError):
+            return None
+        return self.get_snapshot().item_bodies.get(pk)
+
+
+tags_cache = ReferenceDataCache('tags', Tag, TagsSerializer)
+ingredients_cache = ReferenceDataCache(
+    'ingredients', Ingredient, IngredientsSerializer
+)
+
+
+class ReferenceDataMixin:
+    """
+    Отдаёт `list` и `retrieve` из `reference_cache` без обращения к базе
+    данных. Справочники доступны всем, поэтому аутентификация не нужна.
+    """
+    reference_cache = None
+    authentication_classes = ()
+    permission_classes = ()
+
+    def list(self, request, *args, **kwargs):
+        return HttpResponse(
+            self.reference_cache.get_snapshot().list_body,
+            content_type='application/json'
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        body = self.reference_cache.get_item_body(
+            kwargs.get(self.lookup_url_kwarg or self.lookup_field)
+        )
+        if body is None:
+            raise Http404
+        return HttpResponse(body, content_type='application/json')
@@ -0,0 +1,168 @@
+import asyncio
+import hashlib
+import random
+import time
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS, connections
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class RequestState:
+    """Состояние запроса: чтение из `default` и были ли записи."""
+
+    def __init__(self, pinned):
+        self.pinned = pinned
+        self.wrote = False
+
+
+_request_state = ContextVar('replica_request_state', default=None)
+_use_primary = ContextVar('replica_use_primary', default=False)
+
+
+@contextmanager
+def use_primary():
+    """
+    Чтение внутри блока идёт в `default`. Нужно для данных, которые
+    попадают в долгоживущие кэши: снимок реплики с задержкой остался бы в
+    кэше и после того, как реплика догонит основную базу.
+    """
+    token = _use_primary.set(True)
+    try:
+        yield
+    finally:
+        _use_primary.reset(token)
+
+
+class PrimaryReplicaRouter:
+    """
+    Запись - в `default`, чтение в запросах безопасными методами - в
+    случайную реплику из `DATABASE_REPLICAS`. Чтение идёт в `default`
+    вне HTTP запросов (команды, фоновые потоки), внутри транзакции и
+    `use_primary`, в запросах с изменениями и для закреплённых клиентов
+    (см. `ReplicaPinningMiddleware`).
+    """
+
+    def db_for_read(self, model, **hints):
+        state = _request_state.get()
+        if (
+            not settings.DATABASE_REPLICAS
+            or state is None
+            or state.pinned
+            or _use_primary.get()
+            or connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            return DEFAULT_DB_ALIAS
+        # Связанные объекты читаются из той же реплики.
+        instance = hints.get('instance')
+        if (
+            instance is not None
+            and instance._state.db in settings.DATABASE_REPLICAS
+        ):
+            return instance._state.db
+        return random.choice(settings.DATABASE_REPLICAS)
+
+    def db_for_write(self, model, **hints):
+        state = _request_state.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = (DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS)
+        return obj1._state.db in databases and obj2._state.db in databases
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Схема реплик обновляется репликацией.
+        return db == DEFAULT_DB_ALIAS
+
+
+class ReplicaPinningMiddleware:
+    """
+    Закрепляет клиента за `default` на `REPLICA_PIN_SECONDS` секунд после
+    запроса с записью в базу, пока время не прошло, клиент читает свои
+    изменения без задержки репликации. Клиент закрепляется cookie
+    `REPLICA_PIN_COOKIE` со временем окончания и, если запрос передал
+    заголовок `Authorization`, записью по токену в общем кэше
+    `REPLICA_PIN_CACHE` для клиентов API без cookie.
+    Без реплик middleware отключается. Работает и в синхронной, и в
+    асинхронной цепочке middleware: состояние запроса хранится в контексте,
+    который `sync_to_async` передаёт в поток представления.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.DATABASE_REPLICAS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            # Так Django определяет асинхронные middleware.
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    @staticmethod
+    def get_pin_key(request):
+        authorization = request.META.get('HTTP_AUTHORIZATION')
+        if not authorization:
+            return None
+        digest = hashlib.sha256(authorization.encode()).hexdigest()
+        return f'replica_pin:{digest}'
+
+    def is_pinned(self, request, pin_key):
+        if request.method not in SAFE_METHODS:
+            return True
+        try:
+            pinned_until = float(
+                request.COOKIES.get(settings.REPLICA_PIN_COOKIE, 0)
+            )
+        except ValueError:
+            pinned_until = 0
+        if pinned_until <= time.time() and pin_key is not None:
+            pinned_until = caches[settings.REPLICA_PIN_CACHE].get(pin_key, 0)
+        return pinned_until > time.time()
+
+    def pin(self, response, pin_key):
+        pinned_until = time.time() + settings.REPLICA_PIN_SECONDS
+        response.set_cookie(
+            settings.REPLICA_PIN_COOKIE,
+            str(pinned_until),
+            max_age=settings.REPLICA_PIN_SECONDS,
+            httponly=True,
+            samesite='Lax'
+        )
+        if pin_key is not None:
+            caches[settings.REPLICA_PIN_CACHE].set(
+                pin_key, pinned_until, settings.REPLICA_PIN_SECONDS
+            )
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self):
+            return self.__acall__(request)
+        pin_key = self.get_pin_key(request)
+        state = RequestState(self.is_pinned(request, pin_key))
+        token = _request_state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _request_state.reset(token)
+        if state.wrote:
+            self.pin(response, pin_key)
+        return response
+
+    async def __acall__(self, request):
+        pin_key = self.get_pin_key(request)
+        state = RequestState(self.is_pinned(request, pin_key))
+        token = _request_state.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _request_state.reset(token)
+        if state.wrote:
+            self.pin(response, pin_key)
+        return response
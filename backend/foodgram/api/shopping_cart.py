@@ -0,0 +1,131 @@
+import csv
+import hashlib
+import io
+import json
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import F, Sum
+
+from api.utilits import get_shopping_cart_line, stream_shopping_cart_pdf
+
+SHOPPING_CART_CACHE = 'shopping_cart'
+
+
+def get_shopping_cart_items(user):
+    """
+    Сводный список ингредиентов из списка покупок пользователя.
+    Каждый элемент имеет ключи: `name`, `unit`, `amount`.
+    """
+    return list(
+        user.shopping_carts.values(
+            name=F('recipe__ingredient_amounts__ingredient__name'),
+            unit=F('recipe__ingredient_amounts__ingredient__measurement_unit')
+        ).annotate(
+            amount=Sum('recipe__ingredient_amounts__amount')
+        ).order_by('name', 'unit')
+    )
+
+
+def stream_shopping_cart_text(items):
+    """Генератор байтов списка покупок в виде текста."""
+    for i, item in enumerate(items, 1):
+        yield f'{get_shopping_cart_line(i, item)}\n'.encode()
+
+
+def stream_shopping_cart_csv(items):
+    """Генератор байтов списка покупок в формате CSV."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(('name', 'amount', 'unit'))
+    for item in items:
+        writer.writerow((item['name'], item['amount'], item['unit']))
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue().encode()
+
+
+def stream_shopping_cart_json(items):
+    """Генератор байтов списка покупок в формате JSON."""
+    yield json.dumps(items, ensure_ascii=False).encode()
+
+
+SHOPPING_CART_FORMATS = {
+    'pdf': ('application/pdf', stream_shopping_cart_pdf),
+    'txt': ('text/plain; charset=utf-8', stream_shopping_cart_text),
+    'csv': ('text/csv; charset=utf-8', stream_shopping_cart_csv),
+    'json': ('application/json', stream_shopping_cart_json),
+}
+DEFAULT_SHOPPING_CART_FORMAT = 'pdf'
+
+
+def get_shopping_cart_fingerprint(items, export_format):
+    """
+    Хэш содержимого списка покупок и формата файла,
+    используется как ключ кэша и ETag.
+    """
+    return hashlib.sha256(
+        json.dumps(
+            (export_format, items), ensure_ascii=False, default=str
+        ).encode()
+    ).hexdigest()
+
+
+def _user_key(user_id, export_format):
+    return f'shopping_cart:{user_id}:{export_format}'
+
+
+def _body_key(user_id, fingerprint):
+    return f'shopping_cart:{user_id}:{fingerprint}'
+
+
+def get_cached_shopping_cart(user_id, fingerprint):
+    """Возвращает закэшированный файл списка покупок или `None`."""
+    return caches[SHOPPING_CART_CACHE].get(_body_key(user_id, fingerprint))
+
+
+def cache_shopping_cart(user_id, export_format, fingerprint, chunks):
+    """
+    Отдаёт части файла дальше и после последней сохраняет файл в кэш.
+    Файлы больше `SHOPPING_CART_CACHE_MAX_SIZE` байт не кэшируются, общий
+    размер кэша ограничен его `MAX_SIZE`.
+    Для пользователя хранится только последний файл каждого формата.
+    """
+    body = []
+    size = 0
+    for chunk in chunks:
+        yield chunk
+        if body is None:
+            continue
+        size += len(chunk)
+        if size > settings.SHOPPING_CART_CACHE_MAX_SIZE:
+            body = None
+        else:
+            body.append(chunk)
+    if body is None:
+        return
+    cache = caches[SHOPPING_CART_CACHE]
+    previous = cache.get(_user_key(user_id, export_format))
+    if previous is not None:
+        cache.delete(_body_key(user_id, previous))
+    cache.set_many({
+        _user_key(user_id, export_format): fingerprint,
+        _body_key(user_id, fingerprint): b''.join(body),
+    })
+
+
+def invalidate_shopping_cart(user_id):
+    """Удаляет из кэша файлы списка покупок пользователя во всех форматах."""
+    cache = caches[SHOPPING_CART_CACHE]
+    user_keys = [
+        _user_key(user_id, export_format)
+        for export_format in SHOPPING_CART_FORMATS
+    ]
+    fingerprints = cache.get_many(user_keys)
+    if not fingerprints:
+        return
+    cache.delete_many(user_keys + [
+        _body_key(user_id, fingerprint)
+        for fingerprint in fingerprints.values()
+    ])
@@ -0,0 +1,42 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from api.reference_data import ingredients_cache, tags_cache
+from api.shopping_cart import invalidate_shopping_cart
+from recipes.models import Ingredient, ShoppingCart, Tag
+from recipes.signals import data_loaded
+
+
+@receiver(post_save, sender=ShoppingCart)
+@receiver(post_delete, sender=ShoppingCart)
+def shopping_cart_changed(sender, instance, **kwargs):
+    """Сбрасывает кэш скачанного списка покупок при его изменении."""
+    invalidate_shopping_cart(instance.user_id)
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def ingredient_changed(sender, **kwargs):
+    """
+    Сбрасывает кэш ингредиентов во всех процессах после фиксации
+    транзакции: иначе другой процесс может построить снимок новой версии
+    по ещё не изменённым строкам и хранить его до следующего изменения.
+    """
+    transaction.on_commit(ingredients_cache.invalidate)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def tag_changed(sender, **kwargs):
+    """Сбрасывает кэш тэгов во всех процессах после фиксации транзакции."""
+    transaction.on_commit(tags_cache.invalidate)
+
+
+@receiver(data_loaded)
+def reference_data_loaded(sender, **kwargs):
+    """Сбрасывает кэш справочника после массовой загрузки."""
+    if sender is Ingredient:
+        transaction.on_commit(ingredients_cache.invalidate)
+    elif sender is Tag:
+        transaction.on_commit(tags_cache.invalidate)
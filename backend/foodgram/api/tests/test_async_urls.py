@@ -0,0 +1,49 @@
+import asyncio
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import include, path, resolve, reverse
+from rest_framework.test import APIClient
+
+from api.urls import ASYNC_READ_ROUTES, get_async_read_urls, router
+
+User = get_user_model()
+
+# Порядок маршрутов как в `api.urls` при `ASYNC_READ_VIEWS`.
+urlpatterns = [
+    path('api/', include(get_async_read_urls() + [
+        path('', include(router.urls)),
+    ])),
+]
+
+
+@override_settings(ROOT_URLCONF=__name__)
+class AsyncReadUrlsTest(TestCase):
+    """
+    Асинхронные маршруты объектов не перехватывают действия списка,
+    подключённые `router` после них.
+    """
+
+    def test_list_actions_resolve_to_router(self):
+        for prefix, viewset, basename in ASYNC_READ_ROUTES:
+            for action in viewset.get_extra_actions():
+                if action.detail:
+                    continue
+                with self.subTest(action=action.url_name):
+                    url_name = f'{basename}-{action.url_name}'
+                    match = resolve(reverse(url_name))
+                    self.assertEqual(match.url_name, url_name)
+                    self.assertNotIn('pk', match.kwargs)
+
+    def test_detail_resolves_to_async_view(self):
+        match = resolve('/api/recipes/1/')
+        self.assertEqual(match.url_name, 'recipe-detail')
+        self.assertTrue(asyncio.iscoroutinefunction(match.func))
+
+    def test_download_shopping_cart(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user(
+            username='cook', email='cook@foodgram.ru', password='pass'
+        ))
+        response = client.get('/api/recipes/download_shopping_cart/')
+        self.assertEqual(response.status_code, 200)
@@ -0,0 +1,67 @@
+import pickle
+
+from django.test import SimpleTestCase
+
+from api.cache import SizeLimitedLocMemCache
+
+VALUE_SIZE = 300
+MAX_SIZE = 1000
+
+
+def get_value(char):
+    return char.encode() * VALUE_SIZE
+
+
+class SizeLimitedLocMemCacheTest(SimpleTestCase):
+    """
+    Ограничение размера опирается на внутреннее устройство `LocMemCache`
+    (порядок `_cache`, `_expire_info`), тест фиксирует его поведение.
+    """
+
+    def setUp(self):
+        self.cache = SizeLimitedLocMemCache(
+            f'size-limited-{self._testMethodName}',
+            {'OPTIONS': {'MAX_SIZE': MAX_SIZE, 'MAX_ENTRIES': 100}},
+        )
+        self.cache.clear()
+
+    def get_size(self):
+        return sum(map(len, self.cache._cache.values()))
+
+    def test_size_limit(self):
+        for char in 'abcdef':
+            self.cache.set(char, get_value(char))
+            self.assertLessEqual(self.get_size(), MAX_SIZE)
+        # Значения хранятся в pickle, в `MAX_SIZE` помещаются три.
+        pickled_size = len(
+            pickle.dumps(get_value('a'), pickle.HIGHEST_PROTOCOL)
+        )
+        self.assertEqual(MAX_SIZE // pickled_size, 3)
+        self.assertEqual(
+            self.cache.get_many('abcdef'),
+            {char: get_value(char) for char in 'def'}
+        )
+        self.assertEqual(len(self.cache._expire_info), 3)
+
+    def test_least_recently_used_evicted(self):
+        for char in 'abc':
+            self.cache.set(char, get_value(char))
+        self.cache.get('a')
+        self.cache.set('d', get_value('d'))
+        self.assertEqual(
+            self.cache.get_many('abcd'),
+            {char: get_value(char) for char in 'acd'}
+        )
+
+    def test_too_large_value_not_stored(self):
+        self.cache.set('a', get_value('a'))
+        self.cache.set('b', get_value('b'))
+        self.cache.set('b', b'b' * MAX_SIZE)
+        self.assertIsNone(self.cache.get('b'))
+        self.assertEqual(self.cache.get('a'), get_value('a'))
+
+    def test_without_limit(self):
+        cache = SizeLimitedLocMemCache('size-limited-unbounded', {})
+        for char in 'abcdef':
+            cache.set(char, get_value(char))
+        self.assertEqual(len(cache.get_many('abcdef')), 6)
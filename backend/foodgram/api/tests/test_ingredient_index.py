@@ -0,0 +1,43 @@
+from types import SimpleNamespace
+
+from django.test import SimpleTestCase
+
+from api.ingredient_index import IngredientIndex
+
+NAMES = ['Сыр', 'сырок', 'брынза', 'масло', 'сыроежки', 'плавленый сыр']
+
+
+class IngredientIndexTest(SimpleTestCase):
+    """Порядок выдачи для коротких и длинных запросов одинаковый."""
+
+    def setUp(self):
+        snapshot = SimpleNamespace(data=[
+            {'id': id, 'name': name} for id, name in enumerate(NAMES)
+        ])
+        self.index = IngredientIndex(
+            SimpleNamespace(get_snapshot=lambda: snapshot)
+        )
+
+    def search(self, query, limit=None):
+        return [
+            entry['name'] for entry in self.index.search(query, limit)
+        ]
+
+    def test_prefix_then_substring(self):
+        for query in ('ыр', 'ыро', 'сыр', 'сыро'):
+            with self.subTest(query=query):
+                expected = sorted(
+                    (not name.lower().startswith(query), name.lower(), name)
+                    for name in NAMES if query in name.lower()
+                )
+                self.assertEqual(
+                    self.search(query), [name for *_, name in expected]
+                )
+
+    def test_limit(self):
+        self.assertEqual(self.search('сыр', 2), ['Сыр', 'сыроежки'])
+        self.assertEqual(
+            self.search('ы', 3), ['брынза', 'плавленый сыр', 'Сыр']
+        )
+        self.assertEqual(self.search('р', 1), ['брынза'])
+        self.assertEqual(self.search('рыба', 5), [])
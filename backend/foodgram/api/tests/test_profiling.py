@@ -0,0 +1,54 @@
+import asyncio
+import re
+import time
+
+from django.http import HttpResponse
+from django.test import AsyncClient, TestCase, override_settings
+from django.urls import include, path
+
+SLOW_VIEW_SECONDS = 0.2
+
+
+async def slow_view(request):
+    await asyncio.sleep(SLOW_VIEW_SECONDS)
+    return HttpResponse()
+
+
+urlpatterns = [
+    path('slow/', slow_view),
+    path('api/', include('api.urls')),
+]
+
+
+def get_query_count(response):
+    match = re.search(r'desc="(\d+) queries"', response['Server-Timing'])
+    return int(match[1])
+
+
+@override_settings(ROOT_URLCONF=__name__, REQUEST_PROFILING_SAMPLE_RATE=1)
+class RequestProfilingMiddlewareTest(TestCase):
+    """
+    Замер SQL запросов в синхронной и асинхронной цепочке middleware.
+    Под ASGI middleware не заставляет выполнять запросы по одному.
+    """
+
+    def test_sync_request(self):
+        response = self.client.get('/api/recipes/')
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(get_query_count(response), 0)
+
+    async def test_async_request(self):
+        # Синхронное представление выполняется в другом потоке.
+        response = await AsyncClient().get('/api/recipes/')
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(get_query_count(response), 0)
+
+    async def test_async_requests_run_concurrently(self):
+        client = AsyncClient()
+        started = time.perf_counter()
+        responses = await asyncio.gather(
+            *(client.get('/slow/') for _ in range(4))
+        )
+        elapsed = time.perf_counter() - started
+        self.assertTrue(all('Server-Timing' in r for r in responses))
+        self.assertLess(elapsed, SLOW_VIEW_SECONDS * 2)
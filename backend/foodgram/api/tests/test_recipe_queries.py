@@ -0,0 +1,88 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from recipes.models import (
+    Favorites, Ingredient, IngredientAmount, Recipe, RecipeTags, ShoppingCart,
+    Tag,
+)
+from users.models import Follow
+
+User = get_user_model()
+
+RECIPES_COUNT = 200
+# Страница, флаги избранного, списка покупок и подписок, тэги и
+# ингредиенты страницы и количество рецептов для паджинации.
+RECIPES_LIST_QUERIES = 7
+
+
+class RecipesListQueriesTest(TestCase):
+    """Число запросов списка рецептов не зависит от размера страницы."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='reader', email='reader@foodgram.ru', password='pass'
+        )
+        authors = [
+            User.objects.create_user(
+                username=f'author{number}',
+                email=f'author{number}@foodgram.ru',
+                password='pass'
+            )
+            for number in range(3)
+        ]
+        tags = [
+            Tag.objects.create(
+                name=f'тэг {number}', color=f'#00000{number}',
+                slug=f'tag{number}'
+            )
+            for number in range(2)
+        ]
+        ingredients = [
+            Ingredient.objects.create(
+                name=f'ингредиент {number}', measurement_unit='г'
+            )
+            for number in range(3)
+        ]
+        # `bulk_create` в SQLite не возвращает `id` созданных объектов.
+        recipes = [
+            Recipe.objects.create(
+                author=authors[number % len(authors)],
+                name=f'рецепт {number}',
+                text='описание',
+                cooking_time=10,
+                image='recipes/image.png'
+            )
+            for number in range(RECIPES_COUNT)
+        ]
+        RecipeTags.objects.bulk_create(
+            RecipeTags(recipe=recipe, tag=tag)
+            for recipe in recipes for tag in tags
+        )
+        IngredientAmount.objects.bulk_create(
+            IngredientAmount(recipe=recipe, ingredient=ingredient, amount=10)
+            for recipe in recipes for ingredient in ingredients
+        )
+        Favorites.objects.bulk_create(
+            Favorites(user=cls.user, recipe=recipe) for recipe in recipes[::3]
+        )
+        ShoppingCart.objects.bulk_create(
+            ShoppingCart(user=cls.user, recipe=recipe)
+            for recipe in recipes[::5]
+        )
+        Follow.objects.create(user=cls.user, author=authors[0])
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_recipes_list_queries(self):
+        for limit in (6, 50, 200):
+            with self.subTest(limit=limit):
+                with self.assertNumQueries(RECIPES_LIST_QUERIES):
+                    response = self.client.get(
+                        '/api/recipes/', {'limit': limit}
+                    )
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(response.data['results']), limit)
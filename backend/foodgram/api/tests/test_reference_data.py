@@ -0,0 +1,31 @@
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+
+from api.reference_data import tags_cache
+from recipes.models import Tag
+
+
+@override_settings(REFERENCE_DATA_VERSION_CACHE='default')
+class ReferenceDataCacheTest(TestCase):
+    """Снимок справочника перестраивается после каждой смены версии."""
+
+    def setUp(self):
+        caches['default'].clear()
+
+    def test_invalidate_sets_new_version(self):
+        versions = {tags_cache.get_version()}
+        for _ in range(3):
+            tags_cache.invalidate()
+            versions.add(tags_cache.get_version())
+        self.assertEqual(len(versions), 4)
+
+    def test_snapshot_rebuilt_after_change(self):
+        self.assertEqual(tags_cache.get_snapshot().data, [])
+        with self.captureOnCommitCallbacks(execute=True):
+            Tag.objects.create(
+                name='завтрак', color='#E26C2D', slug='breakfast'
+            )
+        self.assertEqual(
+            [tag['slug'] for tag in tags_cache.get_snapshot().data],
+            ['breakfast']
+        )
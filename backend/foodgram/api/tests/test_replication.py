@@ -0,0 +1,136 @@
+import asyncio
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.http import HttpResponse
+from django.test import (
+    AsyncClient, RequestFactory, SimpleTestCase, TransactionTestCase,
+    override_settings,
+)
+from django.urls import path
+
+from api.replication import (
+    PrimaryReplicaRouter, ReplicaPinningMiddleware, use_primary,
+)
+from recipes.models import Recipe
+
+REPLICA = 'replica_1'
+TOKEN = 'Token 0123456789abcdef'
+SLOW_VIEW_SECONDS = 0.2
+
+router = PrimaryReplicaRouter()
+
+
+async def slow_view(request):
+    await asyncio.sleep(SLOW_VIEW_SECONDS)
+    return HttpResponse()
+
+
+urlpatterns = [
+    path('slow/', slow_view),
+]
+
+
+@override_settings(DATABASE_REPLICAS=[REPLICA], REPLICA_PIN_CACHE='default')
+class ReplicaPinningTest(TransactionTestCase):
+    """
+    Чтение в запросах без записи идёт в реплику, после записи клиент
+    закрепляется за `default` по cookie и по токену. `TestCase` выполняет
+    тесты в транзакции, а в транзакции чтение всегда идёт в `default`.
+    """
+
+    def setUp(self):
+        caches['default'].clear()
+        self.factory = RequestFactory()
+
+    def request(self, method='get', write=False, **kwargs):
+        """Запрос через middleware: ответ и база, из которой шло чтение."""
+        databases = []
+
+        def get_response(request):
+            databases.append(router.db_for_read(Recipe))
+            if write:
+                router.db_for_write(Recipe)
+            return HttpResponse()
+
+        request = getattr(self.factory, method)('/api/recipes/', **kwargs)
+        response = ReplicaPinningMiddleware(get_response)(request)
+        return response, databases[0]
+
+    def test_read_goes_to_replica(self):
+        response, database = self.request()
+        self.assertEqual(database, REPLICA)
+        self.assertNotIn(settings.REPLICA_PIN_COOKIE, response.cookies)
+
+    def test_reads_outside_requests_go_to_primary(self):
+        self.assertEqual(router.db_for_read(Recipe), 'default')
+
+    def test_unsafe_method_reads_from_primary(self):
+        _, database = self.request('post')
+        self.assertEqual(database, 'default')
+
+    def test_use_primary_and_atomic_read_from_primary(self):
+        def get_response(request):
+            with use_primary():
+                databases.append(router.db_for_read(Recipe))
+            with transaction.atomic():
+                databases.append(router.db_for_read(Recipe))
+            return HttpResponse()
+
+        databases = []
+        ReplicaPinningMiddleware(get_response)(self.factory.get('/'))
+        self.assertEqual(databases, ['default', 'default'])
+
+    def test_write_pins_by_cookie(self):
+        response, _ = self.request('post', write=True)
+        cookie = response.cookies[settings.REPLICA_PIN_COOKIE]
+        _, database = self.request(
+            HTTP_COOKIE=f'{settings.REPLICA_PIN_COOKIE}={cookie.value}'
+        )
+        self.assertEqual(database, 'default')
+
+    def test_write_pins_by_token(self):
+        self.request('post', write=True, HTTP_AUTHORIZATION=TOKEN)
+        _, database = self.request(HTTP_AUTHORIZATION=TOKEN)
+        self.assertEqual(database, 'default')
+        _, database = self.request(HTTP_AUTHORIZATION=f'{TOKEN}0')
+        self.assertEqual(database, REPLICA)
+
+
+@override_settings(
+    ROOT_URLCONF=__name__,
+    DATABASE_REPLICAS=[REPLICA],
+    REPLICA_PIN_CACHE='default',
+)
+class AsyncReplicaPinningTest(SimpleTestCase):
+    """В асинхронной цепочке состояние запроса доходит до потока чтения."""
+
+    async def test_write_in_thread_pins_client(self):
+        async def get_response(request):
+            await sync_to_async(router.db_for_write)(Recipe)
+            return HttpResponse()
+
+        middleware = ReplicaPinningMiddleware(get_response)
+        self.assertTrue(asyncio.iscoroutinefunction(middleware))
+        response = await middleware(RequestFactory().post('/'))
+        self.assertIn(settings.REPLICA_PIN_COOKIE, response.cookies)
+
+    async def test_read_in_thread_goes_to_replica(self):
+        async def get_response(request):
+            databases.append(
+                await sync_to_async(router.db_for_read)(Recipe)
+            )
+            return HttpResponse()
+
+        databases = []
+        await ReplicaPinningMiddleware(get_response)(RequestFactory().get('/'))
+        self.assertEqual(databases, [REPLICA])
+
+    async def test_async_requests_run_concurrently(self):
+        client = AsyncClient()
+        started = time.perf_counter()
+        await asyncio.gather(*(client.get('/slow/') for _ in range(4)))
+        self.assertLess(time.perf_counter() - started, SLOW_VIEW_SECONDS * 2)
@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.urls import include, path, re_path
 from django.views.generic import TemplateView
 from drf_yasg import openapi
@@ -5,6 +6,7 @@ from drf_yasg.views import get_schema_view
 from rest_framework.routers import DefaultRouter
 
 from api import recipe_views, user_views
+from api.async_views import async_read_view
 
 router = DefaultRouter()
 router.register(r'tags', recipe_views.TagsViewSet)
@@ -12,6 +14,48 @@ router.register(r'ingredients', recipe_views.IngredientsViewSet)
 router.register(r'recipes', recipe_views.RecipesViewSet)
 router.register(r'users', user_views.UsersViewSet)
 
+ASYNC_READ_ROUTES = (
+    ('tags', recipe_views.TagsViewSet, 'tag'),
+    ('ingredients', recipe_views.IngredientsViewSet, 'ingredient'),
+    ('recipes', recipe_views.RecipesViewSet, 'recipe'),
+)
+LIST_ACTIONS = {'get': 'list', 'post': 'create'}
+DETAIL_ACTIONS = {
+    'get': 'retrieve',
+    'put': 'update',
+    'patch': 'partial_update',
+    'delete': 'destroy',
+}
+
+
+def get_async_read_urls():
+    """
+    Маршруты списков и объектов `ASYNC_READ_ROUTES` с асинхронным чтением,
+    подключаются перед маршрутами `router` при `ASYNC_READ_VIEWS`.
+    Первичный ключ объекта - только цифры, иначе маршрут перехватил бы
+    действия списка (`recipes/download_shopping_cart/`).
+    """
+    urls = []
+    for prefix, viewset, basename in ASYNC_READ_ROUTES:
+        urls += [
+            re_path(
+                rf'^{prefix}/$',
+                async_read_view(
+                    viewset, router.get_method_map(viewset, LIST_ACTIONS)
+                ),
+                name=f'{basename}-list'
+            ),
+            re_path(
+                rf'^{prefix}/(?P<pk>\d+)/$',
+                async_read_view(
+                    viewset, router.get_method_map(viewset, DETAIL_ACTIONS)
+                ),
+                name=f'{basename}-detail'
+            ),
+        ]
+    return urls
+
+
 schema_view = get_schema_view(
     openapi.Info(
         title="Foodgram API",
@@ -36,5 +80,11 @@ urlpatterns = [
         name='schema-swagger-ui'
     ),
     path('auth/', include('djoser.urls.authtoken')),
+]
+
+if settings.ASYNC_READ_VIEWS:
+    urlpatterns += get_async_read_urls()
+
+urlpatterns += [
     path('', include(router.urls)),
 ]
@@ -5,6 +5,7 @@ from djoser.serializers import (
 )
 from rest_framework import serializers
 
+from api.fields import RecipeImageField, RecipeImageVariantsField
 from recipes.models import Recipe
 from users.models import Follow
 
@@ -39,7 +40,8 @@ class CustomUserSerializer(DjoserUserSerializer):
     """
     Сериалайзер модели пользователя.
     `is_subscribed: boolean` - Подписан ли текущий пользователь на этого
-    пользователя.
+    пользователя. Если в контексте передан `subscribed_ids`, флаг берётся из
+    него без запроса к базе данных.
     """
     is_subscribed = serializers.SerializerMethodField(
         method_name='get_is_subscribed'
@@ -59,6 +61,9 @@ class CustomUserSerializer(DjoserUserSerializer):
         }
 
     def get_is_subscribed(self, obj):
+        subscribed_ids = self.context.get('subscribed_ids')
+        if subscribed_ids is not None:
+            return obj.id in subscribed_ids
         current_user = self.context.get('request').user
         if not current_user.is_authenticated:
             return False
@@ -78,6 +83,7 @@ class FollowSerializer(serializers.ModelSerializer):
     recipes = serializers.SerializerMethodField(
         method_name='get_recipes'
     )
+    recipes_count = serializers.ReadOnlyField(source='author.recipes_count')
 
     class Meta:
         model = Follow
@@ -86,6 +92,7 @@ class FollowSerializer(serializers.ModelSerializer):
             'id', 'username',
             'first_name', 'last_name',
             'is_subscribed', 'recipes',
+            'recipes_count',
             'author', 'user'
         )
         read_only_fields = ('id',)
@@ -97,9 +104,17 @@ class FollowSerializer(serializers.ModelSerializer):
         return ret
 
     def get_is_subscribed(self, obj):
-        return obj.user.follower.filter(author=obj.author).exists()
+        """Сериализуются только существующие подписки."""
+        return True
 
     def get_recipes(self, obj):
+        """
+        Рецепты автора. Если рецепты подгружены заранее в
+        `author.subscription_recipes`, запрос к базе данных не выполняется.
+        """
+        recipes = getattr(obj.author, 'subscription_recipes', None)
+        if recipes is not None:
+            return RecipeMinifiedSerializer(instance=recipes, many=True).data
         recipes_limit = self.context['request'].query_params.get(
             'recipes_limit'
         )
@@ -148,7 +163,9 @@ class UnfollowSerializer(serializers.ModelSerializer):
 
 class RecipeMinifiedSerializer(serializers.ModelSerializer):
     """Уменьшенный сериализатор рецептов."""
+    image = RecipeImageField('thumbnail')
+    image_variants = RecipeImageVariantsField('thumbnail')
 
     class Meta:
         model = Recipe
-        fields = ('id', 'name', 'image', 'cooking_time')
+        fields = ('id', 'name', 'image', 'image_variants', 'cooking_time')
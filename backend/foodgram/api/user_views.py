@@ -1,20 +1,24 @@
 from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import OuterRef, Prefetch, Subquery
 from django.shortcuts import get_object_or_404
 from djoser.views import UserViewSet as DjoserUserViewSet
 from rest_framework import permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 
+from api.profiling import ProfilingMixin
 from api.user_serializers import (
     CustomUserSerializer, FollowSerializer, UnfollowSerializer,
 )
-from api.utilits import LimitPagePagination
+from api.utilits import KeysetPaginationMixin, LimitPagePagination
+from recipes.models import Recipe
 from users.models import Follow
 
 User = get_user_model()
 
 
-class UsersViewSet(DjoserUserViewSet):
+class UsersViewSet(ProfilingMixin, KeysetPaginationMixin, DjoserUserViewSet):
     """Представление данных пользователей."""
     serializer_class = CustomUserSerializer
     pagination_class = LimitPagePagination
@@ -22,14 +26,34 @@ class UsersViewSet(DjoserUserViewSet):
     @action(
         detail=False,
         permission_classes=(permissions.IsAuthenticated,),
-        pagination_class=LimitPagePagination
+        pagination_class=LimitPagePagination,
+        keyset_ordering=('-id',),
     )
     def subscriptions(self, request):
         """
         Возвращает пользователей, на которых подписан текущий пользователь.
-        В выдачу добавляются рецепты.
+        В выдачу добавляются рецепты и их количество, рецепты для всей
+        страницы загружаются одним запросом;
+        `recipes_limit` - количество рецептов каждого автора в выдаче.
+        С параметром `cursor` паджинация идёт по ключу `id` подписки.
         """
-        queryset = Follow.objects.filter(user=request.user)
+        recipes = Recipe.objects.all()
+        recipes_limit = request.query_params.get('recipes_limit')
+        if recipes_limit and recipes_limit.isdigit():
+            recipes = recipes.filter(pk__in=Subquery(
+                Recipe.objects.filter(
+                    author=OuterRef('author')
+                ).values('pk')[:int(recipes_limit)]
+            ))
+        queryset = Follow.objects.filter(
+            user=request.user
+        ).select_related('author').order_by('-id').prefetch_related(
+            Prefetch(
+                'author__recipes',
+                queryset=recipes,
+                to_attr='subscription_recipes'
+            )
+        )
         pages = self.paginate_queryset(queryset)
         if pages is None:
             serializer = FollowSerializer(
@@ -46,6 +70,7 @@ class UsersViewSet(DjoserUserViewSet):
         detail=True,
         permission_classes=(permissions.IsAuthenticated,),
     )
+    @transaction.atomic
     def subscribe(self, request, id):
         """Подписаться на пользователя."""
         author = get_object_or_404(User, id=id)
@@ -60,6 +85,7 @@ class UsersViewSet(DjoserUserViewSet):
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
     @subscribe.mapping.delete
+    @transaction.atomic
     def unsubscribe(self, request, id):
         """Отписаться от пользователя."""
         author = get_object_or_404(User, id=id)
@@ -1,17 +1,40 @@
+import base64
+import json
 import os
+import tempfile
+
+from functools import lru_cache, partial, reduce
+from operator import or_
 
 import reportlab.rl_config
 
 from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Q
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
 from reportlab.pdfgen import canvas
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.exceptions import NotFound
+from rest_framework.negotiation import DefaultContentNegotiation
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from users.models import Follow
 
 reportlab.rl_config.TTFSearchPath.append(
     str(os.path.join(settings.STATIC_ROOT, 'ttfonts'))
 )
 
+PDF_FONT_NAME = 'Arial'
+PDF_FONT_FILE = 'arial.ttf'
+PDF_PAGE_TOP = 800
+PDF_FIRST_LINE = 750
+PDF_BOTTOM_MARGIN = 50
+PDF_LINE_HEIGHT = 25
+PDF_STREAM_CHUNK_SIZE = 64 * 1024
+PDF_SPOOL_MAX_SIZE = 1024 * 1024
+
 
 class LimitPagePagination(PageNumberPagination):
     """Страничный паджинатор.
@@ -21,28 +44,204 @@ class LimitPagePagination(PageNumberPagination):
     page_size_query_param = 'limit'
 
 
+class KeysetPagination(BasePagination):
+    """Паджинатор по ключу сортировки без `COUNT(*)` и `OFFSET`.
+    `cursor` - позиция начала страницы, для первой страницы передаётся пустым;
+    `limit` - задаёт количество объектов на странице.
+    `ordering` - поля сортировки, последнее из них должно быть уникальным.
+    """
+    page_size = 6
+    page_size_query_param = 'limit'
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Неверный курсор.'
+
+    def __init__(self, ordering):
+        self.ordering = ordering
+
+    def get_page_size(self, request):
+        page_size = request.query_params.get(self.page_size_query_param, '')
+        if page_size.isdigit() and int(page_size) > 0:
+            return int(page_size)
+        return self.page_size
+
+    def _fields(self, model):
+        return [
+            (model._meta.get_field(name.lstrip('-')), name.startswith('-'))
+            for name in self.ordering
+        ]
+
+    def decode_cursor(self, request, fields):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            values = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            if not isinstance(values, list) or len(values) != len(fields):
+                raise ValueError
+            return [
+                field.to_python(value)
+                for (field, _), value in zip(fields, values)
+            ]
+        except (TypeError, ValueError, DjangoValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, instance, fields):
+        values = [field.value_to_string(instance) for field, _ in fields]
+        return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+    def _after(self, fields, position):
+        """Условие для объектов, которые идут после `position`."""
+        conditions = []
+        for i, (field, descending) in enumerate(fields):
+            lookup = 'lt' if descending else 'gt'
+            equal = {
+                previous.name: previous_value
+                for (previous, _), previous_value in zip(fields[:i], position)
+            }
+            conditions.append(
+                Q(**equal, **{f'{field.name}__{lookup}': position[i]})
+            )
+        return reduce(or_, conditions)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        fields = self._fields(queryset.model)
+        position = self.decode_cursor(request, fields)
+        queryset = queryset.order_by(*self.ordering)
+        if position is not None:
+            queryset = queryset.filter(self._after(fields, position))
+        page_size = self.get_page_size(request)
+        page = list(queryset[:page_size + 1])
+        self.next_cursor = None
+        if len(page) > page_size:
+            page = page[:page_size]
+            self.next_cursor = self.encode_cursor(page[-1], fields)
+        return page
+
+    def get_next_link(self):
+        if self.next_cursor is None:
+            return None
+        return replace_query_param(
+            self.request.build_absolute_uri(),
+            self.cursor_query_param,
+            self.next_cursor
+        )
+
+    def get_paginated_response(self, data):
+        return Response({'next': self.get_next_link(), 'results': data})
+
+
+class KeysetPaginationMixin:
+    """
+    Включает `KeysetPagination` вместо `pagination_class`, если в запросе
+    передан параметр `cursor` и для действия задан `keyset_ordering`.
+    """
+    keyset_ordering = None
+
+    @property
+    def paginator(self):
+        cursor_query_param = KeysetPagination.cursor_query_param
+        if (
+            not hasattr(self, '_paginator')
+            and self.keyset_ordering is not None
+            and cursor_query_param in self.request.query_params
+        ):
+            self._paginator = KeysetPagination(self.keyset_ordering)
+        return super().paginator
+
+
+class IgnoreFormatContentNegotiation(DefaultContentNegotiation):
+    """
+    Выбор рендерера без учёта параметра `format`.
+    Нужен действиям, которые сами обрабатывают параметр `format`.
+    """
+
+    def select_renderer(self, request, renderers, format_suffix=None):
+        renderer = renderers[0]
+        return renderer, renderer.media_type
+
+
+def get_recipes_flags(user, recipes):
+    """
+    Возвращает контекст сериалайзера с флагами для страницы рецептов.
+    `favorited_ids` - `id` рецептов страницы в избранном пользователя;
+    `shopping_cart_ids` - `id` рецептов страницы в списке покупок;
+    `subscribed_ids` - `id` авторов страницы, на которых подписан пользователь.
+    Для анонимного пользователя множества пустые и запросы не выполняются.
+    """
+    if not user.is_authenticated:
+        return {
+            'favorited_ids': frozenset(),
+            'shopping_cart_ids': frozenset(),
+            'subscribed_ids': frozenset(),
+        }
+    recipe_ids = [recipe.id for recipe in recipes]
+    author_ids = {recipe.author_id for recipe in recipes}
+    return {
+        'favorited_ids': frozenset(
+            user.favorites.filter(
+                recipe__in=recipe_ids
+            ).values_list('recipe_id', flat=True)
+        ),
+        'shopping_cart_ids': frozenset(
+            user.shopping_carts.filter(
+                recipe__in=recipe_ids
+            ).values_list('recipe_id', flat=True)
+        ),
+        'subscribed_ids': frozenset(
+            Follow.objects.filter(
+                user=user, author__in=author_ids
+            ).values_list('author_id', flat=True)
+        ),
+    }
+
+
+def get_shopping_cart_line(number, item):
+    """Строка списка покупок: `1.  Мука - 500 г`."""
+    return f"{number}.  {item['name']} - {item['amount']} {item['unit']}"
+
+
+@lru_cache(maxsize=None)
+def register_pdf_font():
+    """Регистрирует шрифт PDF один раз за время жизни процесса."""
+    pdfmetrics.registerFont(
+        TTFont(PDF_FONT_NAME, PDF_FONT_FILE, 'UTF-8')
+    )
+
+
 def get_shopping_cart_pdf(shopping_cart_queryset, writable_object):
     """
     Создаёт PDF файл с данными перданного queryset.
     Каждый объект queryset имеет ключи: `name`, `amount`, `unit`.
+    Строки, не поместившиеся на страницу, переносятся на следующую.
     """
-    pdfmetrics.registerFont(
-        TTFont('Arial', 'arial.ttf', 'UTF-8')
-    )
+    register_pdf_font()
     page = canvas.Canvas(writable_object)
-    page.setFont('Arial', size=24)
-    page.drawString(200, 800, 'Список ингредиентов')
-    page.setFont('Arial', size=16)
-    height = 750
+    page.setFont(PDF_FONT_NAME, size=24)
+    page.drawString(200, PDF_PAGE_TOP, 'Список ингредиентов')
+    page.setFont(PDF_FONT_NAME, size=16)
+    height = PDF_FIRST_LINE
     for i, item in enumerate(shopping_cart_queryset, 1):
-        page.drawString(
-            75,
-            height,
-            (
-                f"{i}.  {item['name']} - {item['amount']} {item['unit']}"
-            ),
-        )
-        height -= 25
+        if height < PDF_BOTTOM_MARGIN:
+            page.showPage()
+            page.setFont(PDF_FONT_NAME, size=16)
+            height = PDF_PAGE_TOP
+        page.drawString(75, height, get_shopping_cart_line(i, item))
+        height -= PDF_LINE_HEIGHT
     page.showPage()
     page.save()
     return writable_object
+
+
+def stream_shopping_cart_pdf(shopping_cart_queryset,
+                             chunk_size=PDF_STREAM_CHUNK_SIZE):
+    """
+    Генератор байтов PDF файла списка покупок для `StreamingHttpResponse`.
+    ReportLab собирает документ целиком только в `save()`, поэтому файл
+    пишется во временный буфер, который после `PDF_SPOOL_MAX_SIZE` байт
+    переносится на диск, и отдаётся частями по `chunk_size` байт.
+    """
+    with tempfile.SpooledTemporaryFile(max_size=PDF_SPOOL_MAX_SIZE) as buffer:
+        get_shopping_cart_pdf(shopping_cart_queryset, buffer)
+        buffer.seek(0)
+        yield from iter(partial(buffer.read, chunk_size), b'')
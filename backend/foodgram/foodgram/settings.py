@@ -1,4 +1,5 @@
 import os
+import tempfile
 
 from pathlib import Path
 
@@ -26,12 +27,15 @@ INSTALLED_APPS = [
     'rest_framework.authtoken',
     'recipes.apps.RecipesConfig',
     'users.apps.UsersConfig',
+    'api.apps.ApiConfig',
     'djoser',
     'drf_yasg',
     'django_filters',
 ]
 
 MIDDLEWARE = [
+    'api.profiling.RequestProfilingMiddleware',
+    'api.replication.ReplicaPinningMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -76,6 +80,78 @@ DATABASES = {
     }
 }
 
+# Реплики только для чтения: `DB_REPLICAS` - хосты PostgreSQL или файлы
+# SQLite через запятую, остальные параметры берутся из `default`.
+DATABASE_REPLICAS = []
+for number, replica in enumerate(
+    filter(None, os.getenv('DB_REPLICAS', '').split(',')), start=1
+):
+    alias = f'replica_{number}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'TEST': {'MIRROR': 'default'},
+    }
+    if DATABASES['default']['ENGINE'].endswith('sqlite3'):
+        DATABASES[alias]['NAME'] = replica
+    else:
+        DATABASES[alias]['HOST'] = replica
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['api.replication.PrimaryReplicaRouter']
+
+# После записи чтение клиента идёт в `default` ещё столько секунд.
+REPLICA_PIN_SECONDS = int(os.getenv('DB_REPLICA_PIN_SECONDS', 5))
+REPLICA_PIN_COOKIE = 'primary_db_pin'
+# Закрепление клиентов API по токену, для нескольких хостов нужен общий
+# кэш (Redis, Memcached).
+REPLICA_PIN_CACHE = os.getenv('DB_REPLICA_PIN_CACHE', 'replica_pin')
+
+
+# Cache
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'reference_data': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.getenv(
+            'REFERENCE_DATA_CACHE_LOCATION',
+            os.path.join(tempfile.gettempdir(), 'foodgram_reference_data')
+        ),
+        'TIMEOUT': None,
+    },
+    'token_auth': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.getenv(
+            'TOKEN_AUTH_CACHE_LOCATION',
+            os.path.join(tempfile.gettempdir(), 'foodgram_token_auth')
+        ),
+    },
+    'replica_pin': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.getenv(
+            'REPLICA_PIN_CACHE_LOCATION',
+            os.path.join(tempfile.gettempdir(), 'foodgram_replica_pin')
+        ),
+    },
+    # Файлы списков покупок занимают в памяти каждого процесса не больше
+    # `MAX_SIZE` байт (по умолчанию 32 МиБ).
+    'shopping_cart': {
+        'BACKEND': 'api.cache.SizeLimitedLocMemCache',
+        'LOCATION': 'shopping_cart',
+        'TIMEOUT': None,
+        'OPTIONS': {
+            'MAX_ENTRIES': int(
+                os.getenv('SHOPPING_CART_CACHE_MAX_ENTRIES', 256)
+            ),
+            'MAX_SIZE': int(
+                os.getenv('SHOPPING_CART_CACHE_MAX_BYTES', 32 * 1024 * 1024)
+            ),
+        },
+    },
+}
+
 
 # Password validation
 
@@ -122,7 +198,20 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'static')
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
-UPLOAD_FILE_NAME = 'shopping_cart.pdf'
+DEFAULT_FILE_STORAGE = 'recipes.storage.ContentHashStorage'
+UPLOAD_FILE_NAME = 'shopping_cart'
+SHOPPING_CART_CACHE_MAX_SIZE = 1024 * 1024
+REFERENCE_DATA_VERSION_CACHE = 'reference_data'
+TOKEN_AUTH_VERSION_CACHE = 'token_auth'
+TOKEN_AUTH_SHARED_CACHE = os.getenv('TOKEN_AUTH_SHARED_CACHE')
+TOKEN_AUTH_CACHE_TTL = int(os.getenv('TOKEN_AUTH_CACHE_TTL', 300))
+TOKEN_AUTH_CACHE_MAX_SIZE = int(os.getenv('TOKEN_AUTH_CACHE_MAX_SIZE', 10000))
+RECIPE_IMAGE_WORKERS = int(os.getenv('RECIPE_IMAGE_WORKERS', 2))
+RECIPE_IMAGE_QUALITY = 85
+RECIPE_IMAGE_DERIVATIVES = {
+    'thumbnail': (480, 480),
+    'detail': (1200, 1200),
+}
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -133,7 +222,7 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'users.authentication.CachedTokenAuthentication',
     ],
     'SEARCH_PARAM': 'name',
 }
@@ -155,5 +244,43 @@ DJOSER = {
     'HIDE_USERS': False,
 }
 
+# Async read path, opt-in for ASGI deployments (`foodgram.asgi`)
+
+ASYNC_READ_VIEWS = bool(os.getenv('ASYNC_READ_VIEWS', ''))
+ASYNC_READ_THREADS = int(os.getenv('ASYNC_READ_THREADS', 16))
+
+# Request profiling
+
+REQUEST_PROFILING_SAMPLE_RATE = float(
+    os.getenv('REQUEST_PROFILING_SAMPLE_RATE', 0)
+)
+REQUEST_PROFILING_DUPLICATE_THRESHOLD = int(
+    os.getenv('REQUEST_PROFILING_DUPLICATE_THRESHOLD', 5)
+)
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'api.profiling': {
+            'handlers': ('console',),
+            'level': 'INFO',
+        },
+    },
+}
+
+RECIPE_RANK_FAVORITE_WEIGHT = 2
+RECIPE_RANK_SHOPPING_CART_WEIGHT = 1
+RECIPE_TRENDING_HALF_LIFE = 3 * 24 * 60 * 60
+# Строки последних `RECIPE_RANK_GAP_WINDOW` `id` под отметкой пересчёта
+# ждут фиксации транзакции ещё `RECIPE_RANK_GAP_TIMEOUT` секунд.
+RECIPE_RANK_GAP_WINDOW = 1000
+RECIPE_RANK_GAP_TIMEOUT = 60 * 60
+
 MINIMUM_COOKING_TIME = 1
 LEAST_AMOUNT_OF_INGREDIENT = 1
@@ -38,7 +38,9 @@ class IngredientsAdmin(admin.ModelAdmin):
 @admin.register(Recipe)
 class RecipesAdmin(admin.ModelAdmin):
     """Рецепты."""
-    list_display = ('name', 'author', 'favorite_count')
+    list_display = (
+        'name', 'author', 'favorite_count', 'shopping_carts_count'
+    )
     list_filter = ('name', 'author', 'tags')
     search_fields = (
         'name', 'author__username', 'author__email',
@@ -46,9 +48,9 @@ class RecipesAdmin(admin.ModelAdmin):
     filter_horizontal = ('ingredients',)
     inlines = (RecipeTagsInline, IngredientAmountInline)
 
-    @admin.display(description='популярность')
+    @admin.display(description='популярность', ordering='favorites_count')
     def favorite_count(self, obj):
-        return Favorites.objects.filter(recipe=obj).count()
+        return obj.favorites_count
 
 
 @admin.register(Favorites)
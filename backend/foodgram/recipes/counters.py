@@ -0,0 +1,56 @@
+from django.contrib.auth import get_user_model
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from recipes.models import Favorites, Recipe, ShoppingCart
+from users.models import Follow
+
+User = get_user_model()
+
+
+def get_counters():
+    """
+    Денормализованные счётчики: модель, поле счётчика, модель связи и поле
+    связи, по которому считается количество.
+    """
+    return (
+        (Recipe, 'favorites_count', Favorites, 'recipe'),
+        (Recipe, 'shopping_carts_count', ShoppingCart, 'recipe'),
+        (User, 'followers_count', Follow, 'author'),
+        (User, 'recipes_count', Recipe, 'author'),
+    )
+
+
+def change_counter(model, pk, field, delta):
+    """Атомарно изменяет счётчик `field` объекта на `delta`."""
+    model.objects.filter(pk=pk).update(
+        **{field: Greatest(F(field) + delta, 0)}
+    )
+
+
+def count_subquery(model, field):
+    """Количество объектов `model`, ссылающихся через `field` на объект."""
+    return Coalesce(
+        Subquery(
+            model.objects.filter(**{field: OuterRef('pk')}).order_by()
+            .values(field).annotate(count=Count('pk')).values('count')
+        ),
+        0
+    )
+
+
+def reconcile_counters():
+    """
+    Пересчитывает счётчики, значения которых разошлись с фактическими.
+    Возвращает количество исправленных объектов по каждому счётчику.
+    """
+    drift = {}
+    for model, field, related_model, related_field in get_counters():
+        actual = count_subquery(related_model, related_field)
+        drifted = model.objects.annotate(actual=actual).exclude(
+            **{field: F('actual')}
+        ).values('pk')
+        drift[f'{model.__name__}.{field}'] = model.objects.filter(
+            pk__in=drifted
+        ).update(**{field: actual})
+    return drift
@@ -0,0 +1,147 @@
+import functools
+import io
+import logging
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+from PIL import Image, ImageOps, features
+
+from recipes.models import Recipe
+
+logger = logging.getLogger(__name__)
+
+EXTENSIONS = {'JPEG': 'jpg', 'PNG': 'png', 'WEBP': 'webp'}
+DERIVATIVES_DIR = 'recipes/derivatives'
+
+# `Image.Resampling` появился в Pillow 9.1, где константы фильтров модуля
+# `Image` объявлены устаревшими.
+LANCZOS = getattr(Image, 'Resampling', Image).LANCZOS
+
+_executor_lock = threading.Lock()
+
+
+@functools.lru_cache(maxsize=None)
+def _create_executor():
+    return ThreadPoolExecutor(
+        max_workers=settings.RECIPE_IMAGE_WORKERS,
+        thread_name_prefix='recipe-image'
+    )
+
+
+def get_executor():
+    """Пул потоков обработки изображений, создаётся при первом обращении."""
+    with _executor_lock:
+        return _create_executor()
+
+
+def schedule_image_processing(recipe):
+    """
+    После фиксации транзакции передаёт изображение рецепта в пул обработки.
+    При `RECIPE_IMAGE_WORKERS = 0` изображение обрабатывается сразу.
+    """
+    recipe_id, image_name = recipe.pk, recipe.image.name
+
+    def submit():
+        if settings.RECIPE_IMAGE_WORKERS:
+            get_executor().submit(_process_in_worker, recipe_id, image_name)
+        else:
+            process_recipe_image(recipe_id, image_name)
+
+    transaction.on_commit(submit)
+
+
+def _process_in_worker(recipe_id, image_name):
+    try:
+        process_recipe_image(recipe_id, image_name)
+    except Exception:
+        logger.exception(
+            'Не удалось обработать изображение %s рецепта %s',
+            image_name, recipe_id
+        )
+    finally:
+        connections.close_all()
+
+
+def has_alpha(image):
+    return image.mode in ('RGBA', 'LA', 'PA') or (
+        image.mode == 'P' and 'transparency' in image.info
+    )
+
+
+def encode(image, image_format):
+    buffer = io.BytesIO()
+    if image_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+    elif image.mode == 'P':
+        image = image.convert('RGBA')
+    image.save(
+        buffer,
+        image_format,
+        quality=settings.RECIPE_IMAGE_QUALITY,
+        optimize=True
+    )
+    return buffer.getvalue()
+
+
+def get_derivative_formats(source_format):
+    if features.check('webp'):
+        return (source_format, 'WEBP')
+    return (source_format,)
+
+
+def save_derivative(image, name, size, source_format):
+    """
+    Сохраняет уменьшенную до `size` копию в исходном формате и WebP.
+    Возвращает копии от меньшей к большей.
+    """
+    resized = image.copy()
+    resized.thumbnail(size, LANCZOS)
+    variants = []
+    for image_format in get_derivative_formats(source_format):
+        content = encode(resized, image_format)
+        path = default_storage.save(
+            f'{DERIVATIVES_DIR}/{name}.{EXTENSIONS[image_format]}',
+            ContentFile(content)
+        )
+        variants.append({
+            'name': path,
+            'format': image_format.lower(),
+            'width': resized.width,
+            'height': resized.height,
+            'size': len(content),
+        })
+    return sorted(variants, key=lambda variant: variant['size'])
+
+
+def process_recipe_image(recipe_id, image_name):
+    """
+    Перекодирует загруженное изображение рецепта (с учётом ориентации EXIF,
+    без метаданных) и создаёт уменьшенные копии `RECIPE_IMAGE_DERIVATIVES`
+    в исходном формате и WebP. Копии каждого размера сохраняются в
+    `Recipe.image_derivatives` от меньшей к большей.
+    Если изображение рецепта успело смениться, результат отбрасывается.
+    Имена файлов задаёт хранилище по хэшу содержимого.
+    """
+    with default_storage.open(image_name) as image_file:
+        image = Image.open(image_file)
+        image.load()
+    image = ImageOps.exif_transpose(image)
+    source_format = 'PNG' if has_alpha(image) else 'JPEG'
+    derivatives = {}
+    for name, size in settings.RECIPE_IMAGE_DERIVATIVES.items():
+        derivatives[name] = save_derivative(image, name, size, source_format)
+    original = default_storage.save(
+        f'recipes/image.{EXTENSIONS[source_format]}',
+        ContentFile(encode(image, source_format))
+    )
+    # Прежние файлы не удаляются: при хранении по хэшу содержимого они
+    # могут использоваться другими рецептами (см. `collect_media_garbage`).
+    updated = Recipe.objects.filter(pk=recipe_id, image=image_name).update(
+        image=original, image_derivatives=derivatives
+    )
+    return bool(updated)
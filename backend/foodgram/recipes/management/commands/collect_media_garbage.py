@@ -0,0 +1,95 @@
+import posixpath
+
+from datetime import timedelta
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from recipes.models import Recipe
+
+MEDIA_DIRECTORIES = ('recipes',)
+
+
+def walk(storage, directory):
+    """Пути всех файлов каталога `directory` хранилища."""
+    directories, files = storage.listdir(directory)
+    for name in files:
+        yield posixpath.join(directory, name)
+    for name in directories:
+        yield from walk(storage, posixpath.join(directory, name))
+
+
+def get_referenced_files():
+    """Файлы изображений и уменьшенных копий, на которые ссылаются рецепты."""
+    referenced = set()
+    recipes = Recipe.objects.values_list('image', 'image_derivatives')
+    for image, derivatives in recipes.iterator():
+        referenced.add(image)
+        for variants in derivatives.values():
+            referenced.update(variant['name'] for variant in variants)
+    return referenced
+
+
+def is_unused(name, threshold):
+    """
+    Проверка перед удалением: пока шёл обход, файл могли загрузить снова
+    (хранилище обновляет время изменения) или на него мог сослаться
+    рецепт.
+    """
+    return default_storage.get_modified_time(name) <= threshold and not (
+        Recipe.objects.filter(image=name).exists()
+    )
+
+
+class Command(BaseCommand):
+    help = """
+    Команда для удаления файлов изображений рецептов, на которые не ссылается
+    ни один рецепт. Файлы моложе `--min-age` не удаляются: это могут быть
+    загрузки, транзакция которых ещё не завершена, или результат обработки
+    изображения в пуле.
+    Формат команды: `python manage.py collect_media_garbage *keys`
+    `'--min-age'` ключ указывает минимальный возраст файла в часах;
+    `'--dry-run'` ключ только выводит файлы, которые будут удалены.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--min-age',
+            type=float,
+            default=24,
+            help='takes the minimal age in hours of a file to delete')
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='lists unreferenced files without deleting them')
+
+    def handle(self, *args, **options):
+        threshold = timezone.now() - timedelta(hours=options['min_age'])
+        referenced = get_referenced_files()
+        deleted = freed = 0
+        for directory in MEDIA_DIRECTORIES:
+            if not default_storage.exists(directory):
+                continue
+            for name in walk(default_storage, directory):
+                if (
+                    name in referenced
+                    or default_storage.get_modified_time(name) > threshold
+                ):
+                    continue
+                size = default_storage.size(name)
+                if options['dry_run']:
+                    self.stdout.write(name)
+                elif is_unused(name, threshold):
+                    default_storage.delete(name)
+                else:
+                    continue
+                deleted += 1
+                freed += size
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Successfully media collected: {deleted} files, '
+                f'{freed} bytes'
+                + (' (dry run)' if options['dry_run'] else '')
+            )
+        )
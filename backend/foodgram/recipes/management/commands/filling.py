@@ -1,66 +1,256 @@
 import codecs
 import csv
+import io
+import json
 import os
+import re
+import time
+
+from itertools import islice
 
 from django.apps import apps
 from django.conf import settings
 from django.core.management.base import BaseCommand, CommandError
-from django.db.models import ForeignKey
+from django.core.management.color import no_style
+from django.db import connections, router, transaction
 
+from recipes.signals import data_loaded
 
-def get_fk_model(model, fieldname):
-    field_object = model._meta.get_field(fieldname)
-    if isinstance(field_object, ForeignKey):
-        return field_object.related_model
-    return None
+DEFAULT_BATCH_SIZE = 1000
+JSON_CHUNK_SIZE = 64 * 1024
+JSON_SEPARATORS = re.compile(r'[\s,]*')
 
 
-def csv_parser(csv_filename):
+def csv_parser(csv_filename, columns=None):
+    """
+    Читает строки CSV файла как словари.
+    Имена колонок берутся из `columns` или из первой строки файла.
+    """
     with codecs.open(csv_filename, 'r', 'utf_8_sig') as csv_fd:
         reader = csv.reader(csv_fd, delimiter=',')
+        header = columns
         for row in reader:
-            if row:
-                yield row
+            if not row:
+                continue
+            if header is None:
+                header = row
+                continue
+            yield dict(zip(header, row))
+
+
+def json_parser(json_filename, chunk_size=JSON_CHUNK_SIZE):
+    """
+    Потоково читает JSON массив объектов частями по `chunk_size` символов,
+    не загружая файл в память целиком.
+    """
+    decoder = json.JSONDecoder()
+    with open(json_filename, 'r', encoding='utf_8_sig') as json_fd:
+        buffer = json_fd.read(chunk_size).lstrip()
+        if not buffer.startswith('['):
+            raise ValueError(f'{json_filename}: ожидается JSON массив')
+        position = 1
+        eof = False
+        while True:
+            position = JSON_SEPARATORS.match(buffer, position).end()
+            if buffer.startswith(']', position):
+                return
+            try:
+                item, position = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                chunk = json_fd.read(chunk_size)
+                eof = not chunk
+                buffer = buffer[position:] + chunk
+                position = 0
+                continue
+            yield item
+
+
+def get_parser(file_path, columns=None):
+    if os.path.splitext(file_path)[1].lower() == '.json':
+        return json_parser(file_path)
+    return csv_parser(file_path, columns)
+
+
+def batches(iterable, batch_size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch
+
 
+COPY_NULL = r'\N'
 
-def insert_data(model, file):
+
+class CopyStream:
+    """
+    Файлоподобный объект для `COPY FROM STDIN`: по мере чтения
+    преобразует словари из `rows` в строки CSV с колонками полей модели
+    `fields`. Поле ищется в строке по имени или `attname`, отсутствующее
+    получает значение по умолчанию, `None` передаётся как `COPY_NULL`.
+    """
+
+    def __init__(self, rows, fields):
+        self.rows = iter(rows)
+        self.fields = fields
+        self.keys = {
+            key for field in fields for key in (field.name, field.attname)
+        }
+        self.buffer = io.StringIO()
+        self.writer = csv.writer(self.buffer, lineterminator='\n')
+        self.count = 0
+
+    def read(self, size=-1):
+        while size < 0 or self.buffer.tell() < size:
+            row = next(self.rows, None)
+            if row is None:
+                break
+            self.writer.writerow(self.get_values(row))
+            self.count += 1
+        data = self.buffer.getvalue()
+        self.buffer.seek(0)
+        self.buffer.truncate()
+        if 0 <= size < len(data):
+            self.buffer.write(data[size:])
+            return data[:size]
+        return data
+
+    def get_values(self, row):
+        unknown = set(row) - self.keys
+        if unknown:
+            raise ValueError(
+                f'Неизвестные колонки: {", ".join(sorted(unknown))}'
+            )
+        values = []
+        for field in self.fields:
+            if field.name in row:
+                value = row[field.name]
+            elif field.attname in row:
+                value = row[field.attname]
+            else:
+                value = field.get_default()
+            values.append(COPY_NULL if value is None else value)
+        return values
+
+
+def copy_rows(model, rows, connection):
+    """
+    Загружает строки через `COPY FROM STDIN` во временную таблицу со всеми
+    колонками модели и переносит их в таблицу модели, пропуская строки,
+    нарушающие ограничения уникальности (например, `unique_ingredient`).
+    Строки без первичного ключа получают его из последовательности.
+    Возвращает количество прочитанных строк.
+    """
+    fields = model._meta.concrete_fields
+    quote_name = connection.ops.quote_name
+    table = quote_name(model._meta.db_table)
+    staging = quote_name(f'{model._meta.db_table}_filling')
+    pk = quote_name(model._meta.pk.column)
+    columns = ', '.join(quote_name(field.column) for field in fields)
+    columns_without_pk = ', '.join(
+        quote_name(field.column) for field in fields if not field.primary_key
+    )
+    stream = CopyStream(rows, fields)
+    with transaction.atomic(using=connection.alias):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'CREATE TEMPORARY TABLE {staging} ON COMMIT DROP AS '
+                f'SELECT {columns} FROM {table} WITH NO DATA'
+            )
+            cursor.copy_expert(
+                f'COPY {staging} ({columns}) FROM STDIN '
+                f"WITH (FORMAT csv, NULL '{COPY_NULL}')",
+                stream
+            )
+            cursor.execute(
+                f'INSERT INTO {table} ({columns}) '
+                f'SELECT {columns} FROM {staging} '
+                f'WHERE {pk} IS NOT NULL ON CONFLICT DO NOTHING'
+            )
+            cursor.execute(
+                f'INSERT INTO {table} ({columns_without_pk}) '
+                f'SELECT {columns_without_pk} FROM {staging} '
+                f'WHERE {pk} IS NULL ON CONFLICT DO NOTHING'
+            )
+            # Таблица удаляется сразу: внешняя транзакция может загружать
+            # ту же модель ещё раз до фиксации.
+            cursor.execute(f'DROP TABLE {staging}')
+    return stream.count
+
+
+def bulk_create_rows(model, rows, batch_size, connection):
+    """
+    Загружает строки пачками по `batch_size` объектов, пропуская строки,
+    нарушающие ограничения уникальности (например, `unique_ingredient`).
+    Возвращает количество прочитанных строк.
+    """
+    attnames = {}
+
+    def get_attname(field):
+        if field not in attnames:
+            attnames[field] = model._meta.get_field(field).attname
+        return attnames[field]
+
+    count = 0
+    for batch in batches(rows, batch_size):
+        model.objects.using(connection.alias).bulk_create(
+            (
+                model(**{
+                    get_attname(field): value for field, value in row.items()
+                })
+                for row in batch
+            ),
+            ignore_conflicts=True
+        )
+        count += len(batch)
+    return count
+
+
+def insert_data(model, file, batch_size=DEFAULT_BATCH_SIZE, columns=None,
+                use_copy=True):
+    """
+    Загружает объекты `model` из CSV или JSON файла. В PostgreSQL строки
+    передаются через `COPY`, в остальных базах - пачками по `batch_size`
+    объектов. Для `ForeignKey` в файле указывается первичный ключ
+    связанного объекта. Возвращает количество прочитанных строк.
+    """
     if settings.STATICFILES_DIRS:
         base_dir = settings.STATICFILES_DIRS[0]
     else:
         base_dir = settings.STATIC_ROOT
-    file_path = os.path.join(base_dir, 'data')
-    is_header = True
-    header = []
-    model_instanse = model()
-    id = 1
-    for row in csv_parser(os.path.join(file_path, file)):
-        if is_header:
-            header += row
-            is_header = False
-            continue
-
-        if header[0] != 'id':
-            model_instanse.__setattr__('id', id)
-            id += 1
-        for field, value in zip(header, row):
-            rel_model = get_fk_model(model_instanse, field)
-            if rel_model is not None:
-                model_instanse.__setattr__(field, rel_model(value))
-            else:
-                model_instanse.__setattr__(field, value)
-        model_instanse.save()
+    file_path = os.path.join(base_dir, 'data', file)
+    rows = get_parser(file_path, columns)
+    connection = connections[router.db_for_write(model)]
+    if use_copy and connection.vendor == 'postgresql':
+        count = copy_rows(model, rows, connection)
+    else:
+        count = bulk_create_rows(model, rows, batch_size, connection)
+    # Первичные ключи из файла не продвигают последовательность.
+    with connection.cursor() as cursor:
+        for sql in connection.ops.sequence_reset_sql(no_style(), [model]):
+            cursor.execute(sql)
+    data_loaded.send(sender=model, count=count)
+    return count
 
 
 class Command(BaseCommand):
     help = """
-    Команда для наполнения базы данных из файлов .csv.
+    Команда для наполнения базы данных из файлов .csv и .json.
     Формат команды: `python manage.py filling *keys`
     `'-a', '--app'` ключ указывает на имя приложения;
     `'-m', '--model'` ключ указывает класс модели в models.py;
-    `'-f', '--file'` ключ указывает имя файла в директории `static/data/`
-    Пример команды для заполнения данными о пользователях в модели `Title`
-    приложения `reviews` из файла `titles.csv`:
-    `python manage.py filling -a reviews -m Title -f titles.csv`
+    `'-f', '--file'` ключ указывает имя файла в директории `static/data/`;
+    `'-b', '--batch-size'` ключ указывает количество объектов в одном запросе;
+    `'-c', '--columns'` ключ указывает имена колонок через запятую для .csv
+    файла без строки заголовка;
+    `'--no-copy'` ключ отключает загрузку через `COPY` в PostgreSQL.
+    Пример команды для заполнения данными об ингредиентах в модели
+    `Ingredient` приложения `recipes` из файла `ingredients.csv`:
+    `python manage.py filling -a recipes -m Ingredient -f ingredients.csv
+    -c name,measurement_unit`
     """
 
     def add_arguments(self, parser):
@@ -76,16 +266,39 @@ class Command(BaseCommand):
             '-f', '--file',
             required=True,
             help='accepts a filename with extension')
+        parser.add_argument(
+            '-b', '--batch-size',
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help='takes the number of objects inserted in one query')
+        parser.add_argument(
+            '-c', '--columns',
+            help='takes comma separated column names of a headerless csv')
+        parser.add_argument(
+            '--no-copy',
+            action='store_false',
+            dest='use_copy',
+            help='disables loading through COPY on PostgreSQL')
 
     def handle(self, *args, **options):
+        columns = options['columns']
         try:
             model = apps.get_model(options['app'], options['model'])
-            insert_data(model, options['file'])
+            started = time.perf_counter()
+            rows = insert_data(
+                model,
+                options['file'],
+                batch_size=options['batch_size'],
+                columns=columns.split(',') if columns else None,
+                use_copy=options['use_copy']
+            )
+            elapsed = time.perf_counter() - started
         except Exception as e:
             raise CommandError(f'{e}')
 
         self.stdout.write(
             self.style.SUCCESS(
-                f'Successfully {model.__name__} filled'
+                f'Successfully {model.__name__} filled: {rows} rows '
+                f'in {elapsed:.2f} s ({rows / max(elapsed, 1e-6):.0f} rows/s)'
             )
         )
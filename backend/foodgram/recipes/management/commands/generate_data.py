@@ -0,0 +1,94 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes.synthetic import generate
+
+SCALES = {
+    '10k': 10_000,
+    '100k': 100_000,
+    '1m': 1_000_000,
+}
+
+
+class Command(BaseCommand):
+    help = """
+    Команда для наполнения базы синтетическими пользователями, рецептами,
+    избранным, списками покупок и подписками для проверки производительности.
+    Данные одинаковы при одном `seed`, ингредиенты должны быть загружены
+    командой `filling`.
+    Формат команды: `python manage.py generate_data *keys`
+    `'-s', '--scale'` ключ указывает количество рецептов: 10k, 100k или 1m;
+    `'-r', '--recipes'` ключ указывает произвольное количество рецептов;
+    `'-u', '--users'` ключ указывает количество пользователей, по умолчанию
+    десятая часть рецептов;
+    `'--favorites'`, `'--shopping-carts'`, `'--follows'` ключи указывают
+    среднее количество добавлений на пользователя;
+    `'--seed'` ключ указывает начальное значение генератора;
+    `'-b', '--batch-size'` ключ указывает количество объектов в одном запросе.
+    Пример команды: `python manage.py generate_data -s 100k --seed 1`
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '-s', '--scale',
+            choices=SCALES,
+            default='10k',
+            help='takes the dataset size')
+        parser.add_argument(
+            '-r', '--recipes',
+            type=int,
+            help='takes the number of recipes, overrides --scale')
+        parser.add_argument(
+            '-u', '--users',
+            type=int,
+            help='takes the number of users')
+        parser.add_argument(
+            '--favorites',
+            type=float,
+            default=20,
+            help='takes the mean number of favorites per user')
+        parser.add_argument(
+            '--shopping-carts',
+            type=float,
+            default=5,
+            help='takes the mean number of shopping cart recipes per user')
+        parser.add_argument(
+            '--follows',
+            type=float,
+            default=10,
+            help='takes the mean number of follows per user')
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='takes the random generator seed')
+        parser.add_argument(
+            '-b', '--batch-size',
+            type=int,
+            default=1000,
+            help='takes the number of objects inserted in one query')
+
+    def handle(self, *args, **options):
+        recipes = options['recipes'] or SCALES[options['scale']]
+        users = options['users'] or max(recipes // 10, 2)
+        started = time.perf_counter()
+        try:
+            created = generate(
+                users=users,
+                recipes=recipes,
+                favorites=options['favorites'],
+                shopping_carts=options['shopping_carts'],
+                follows=options['follows'],
+                seed=options['seed'],
+                batch_size=options['batch_size'],
+                log=self.stdout.write,
+            )
+        except Exception as e:
+            raise CommandError(f'{e}')
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Successfully data generated: {created["recipes"]} recipes '
+                f'in {time.perf_counter() - started:.2f} s'
+            )
+        )
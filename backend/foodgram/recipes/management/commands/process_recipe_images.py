@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+
+from recipes.images import process_recipe_image
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = """
+    Команда для перекодирования изображений рецептов и создания уменьшенных
+    копий, если они ещё не созданы (например, для рецептов, загруженных до
+    появления обработки изображений или при сбое пула обработки).
+    Формат команды: `python manage.py process_recipe_images *keys`
+    `'--all'` ключ обрабатывает заново изображения всех рецептов.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='reprocesses images of all recipes')
+
+    def handle(self, *args, **options):
+        recipes = Recipe.objects.exclude(image='')
+        if not options['all']:
+            recipes = recipes.filter(image_derivatives={})
+        processed = failed = 0
+        for recipe_id, image_name in recipes.values_list('pk', 'image'):
+            try:
+                process_recipe_image(recipe_id, image_name)
+            except Exception as e:
+                failed += 1
+                self.stderr.write(f'{image_name}: {e}')
+                continue
+            processed += 1
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Successfully images processed: {processed}, '
+                f'failed: {failed}'
+            )
+        )
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipes.counters import reconcile_counters
+
+
+class Command(BaseCommand):
+    help = """
+    Команда для пересчёта денормализованных счётчиков избранного, списков
+    покупок, подписчиков и рецептов, если они разошлись с фактическими.
+    Формат команды: `python manage.py reconcile_counters`
+    """
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            drift = reconcile_counters()
+        for counter, fixed in drift.items():
+            self.stdout.write(f'{counter}: исправлено {fixed}')
+        self.stdout.write(
+            self.style.SUCCESS('Successfully counters reconciled')
+        )
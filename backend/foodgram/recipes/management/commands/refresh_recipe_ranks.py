@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from recipes.ranking import refresh_recipe_ranks
+
+
+class Command(BaseCommand):
+    help = """
+    Команда для пересчёта рейтингов рецептов `popular` и `trending`.
+    Запускается периодически, например из cron.
+    Формат команды: `python manage.py refresh_recipe_ranks`
+    """
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        updated = refresh_recipe_ranks()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Successfully ranks refreshed: {updated} recipes with new '
+                f'activity in {time.monotonic() - started:.2f} s'
+            )
+        )
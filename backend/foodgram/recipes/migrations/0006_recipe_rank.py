@@ -0,0 +1,39 @@
+# Generated by Django 3.2 on 2026-10-18 04:41
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0005_recipe_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeRank',
+            fields=[
+                ('recipe', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='rank', serialize=False, to='recipes.recipe', verbose_name='рецепт')),
+                ('popularity', models.FloatField(db_index=True, default=0, verbose_name='популярность')),
+                ('trending', models.FloatField(db_index=True, default=0, verbose_name='набирает популярность')),
+            ],
+            options={
+                'verbose_name': 'рейтинг рецепта',
+                'verbose_name_plural': 'рейтинги рецептов',
+            },
+        ),
+        migrations.CreateModel(
+            name='RecipeRankState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('refreshed_at', models.DateTimeField(null=True, verbose_name='время пересчёта')),
+                ('last_favorite_id', models.BigIntegerField(default=0, verbose_name='последнее учтённое избранное')),
+                ('last_shopping_cart_id', models.BigIntegerField(default=0, verbose_name='последний учтённый список покупок')),
+            ],
+            options={
+                'verbose_name': 'состояние пересчёта рейтингов',
+                'verbose_name_plural': 'состояние пересчёта рейтингов',
+            },
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 3.2 on 2026-10-18 05:12
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def set_trending_epoch(apps, schema_editor):
+    # Сохранённые значения `trending` затухли ко времени прошлого
+    # пересчёта, оно и становится точкой отсчёта.
+    RecipeRankState = apps.get_model('recipes', 'RecipeRankState')
+    RecipeRankState.objects.update(trending_epoch=F('refreshed_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0008_recipe_image_derivatives'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reciperank',
+            name='stale',
+            field=models.BooleanField(db_index=True, default=False, verbose_name='нужен пересчёт'),
+        ),
+        migrations.AddField(
+            model_name='reciperankstate',
+            name='favorite_gaps',
+            field=models.JSONField(blank=True, default=list, verbose_name='пропуски избранного'),
+        ),
+        migrations.AddField(
+            model_name='reciperankstate',
+            name='shopping_cart_gaps',
+            field=models.JSONField(blank=True, default=list, verbose_name='пропуски списков покупок'),
+        ),
+        migrations.AddField(
+            model_name='reciperankstate',
+            name='trending_epoch',
+            field=models.DateTimeField(null=True, verbose_name='точка отсчёта trending'),
+        ),
+        migrations.RunPython(set_trending_epoch, migrations.RunPython.noop),
+    ]
@@ -96,11 +96,37 @@ class Recipe(models.Model):
         'дата публикации',
         auto_now=True
     )
+    favorites_count = models.PositiveIntegerField(
+        'добавлений в избранное',
+        default=0,
+        editable=False
+    )
+    shopping_carts_count = models.PositiveIntegerField(
+        'добавлений в список покупок',
+        default=0,
+        editable=False
+    )
+    image_derivatives = models.JSONField(
+        'уменьшенные копии изображения',
+        default=dict,
+        blank=True,
+        editable=False
+    )
 
     class Meta:
         ordering = ('-pub_date',)
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
+        indexes = (
+            models.Index(
+                fields=('-pub_date', '-id'),
+                name='recipe_pub_date_idx'
+            ),
+            models.Index(
+                fields=('author', '-pub_date', '-id'),
+                name='recipe_author_pub_date_idx'
+            ),
+        )
 
     def __str__(self):
         return self.name
@@ -157,6 +183,12 @@ class RecipeTags(models.Model):
     class Meta:
         verbose_name = 'Тег рецепта'
         verbose_name_plural = 'Теги рецепта'
+        indexes = (
+            models.Index(
+                fields=('tag', 'recipe'),
+                name='recipe_tags_tag_recipe_idx'
+            ),
+        )
 
     def __str__(self):
         return f'{self.tag.name} - {self.recipe.name}'
@@ -218,3 +250,67 @@ class ShoppingCart(models.Model):
 
     def __str__(self):
         return f'{self.recipe.name} - {self.user.username}'
+
+
+class RecipeRank(models.Model):
+    """
+    Рейтинг рецепта, пересчитывается командой `refresh_recipe_ranks`.
+    `popularity` - взвешенная сумма добавлений в избранное и списки покупок;
+    `trending` - та же сумма, каждое добавление в которой умножено на
+    `2 ** ((t - trending_epoch) / RECIPE_TRENDING_HALF_LIFE)`: сохранённые
+    значения не затухают, а порядок совпадает с порядком затухающей суммы;
+    `stale` - `popularity` нужно пересчитать после удаления из избранного
+    или списка покупок.
+    """
+    recipe = models.OneToOneField(
+        Recipe,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='rank',
+        verbose_name='рецепт'
+    )
+    popularity = models.FloatField('популярность', default=0, db_index=True)
+    trending = models.FloatField(
+        'набирает популярность', default=0, db_index=True
+    )
+    stale = models.BooleanField('нужен пересчёт', default=False, db_index=True)
+
+    class Meta:
+        verbose_name = 'рейтинг рецепта'
+        verbose_name_plural = 'рейтинги рецептов'
+
+    def __str__(self):
+        return f'{self.recipe_id}: {self.popularity} / {self.trending}'
+
+
+class RecipeRankState(models.Model):
+    """
+    Состояние пересчёта рейтингов: время последнего пересчёта, точка
+    отсчёта `trending`, последние учтённые `id` избранного и списков
+    покупок и пропуски `id` под ними, строки с которыми могут появиться
+    позже (транзакции, зафиксированные после пересчёта), в виде списков
+    `[id, время обнаружения]`.
+    """
+    refreshed_at = models.DateTimeField('время пересчёта', null=True)
+    trending_epoch = models.DateTimeField(
+        'точка отсчёта trending', null=True
+    )
+    last_favorite_id = models.BigIntegerField(
+        'последнее учтённое избранное', default=0
+    )
+    last_shopping_cart_id = models.BigIntegerField(
+        'последний учтённый список покупок', default=0
+    )
+    favorite_gaps = models.JSONField(
+        'пропуски избранного', default=list, blank=True
+    )
+    shopping_cart_gaps = models.JSONField(
+        'пропуски списков покупок', default=list, blank=True
+    )
+
+    class Meta:
+        verbose_name = 'состояние пересчёта рейтингов'
+        verbose_name_plural = 'состояние пересчёта рейтингов'
+
+    def __str__(self):
+        return f'{self.refreshed_at}'
@@ -0,0 +1,152 @@
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Max, OuterRef, Q, Subquery
+from django.utils import timezone
+
+from recipes.models import (
+    Favorites, Recipe, RecipeRank, RecipeRankState, ShoppingCart,
+)
+
+# Когда множитель новых добавлений `trending` достигает `2 ** 64`, все
+# значения один раз уменьшаются и точка отсчёта сдвигается, чтобы не
+# терять точность и не переполнить float.
+TRENDING_REBASE_EXPONENT = 64
+BATCH_SIZE = 500
+
+
+def get_rank_sources():
+    """
+    Источники рейтинга: модель, вес добавления, поле последнего `id` и
+    поле пропусков `id`.
+    """
+    return (
+        (
+            Favorites,
+            settings.RECIPE_RANK_FAVORITE_WEIGHT,
+            'last_favorite_id',
+            'favorite_gaps',
+        ),
+        (
+            ShoppingCart,
+            settings.RECIPE_RANK_SHOPPING_CART_WEIGHT,
+            'last_shopping_cart_id',
+            'shopping_cart_gaps',
+        ),
+    )
+
+
+def batches(values):
+    values = list(values)
+    for start in range(0, len(values), BATCH_SIZE):
+        yield values[start:start + BATCH_SIZE]
+
+
+def _collect_increments(state, now):
+    """
+    Вес добавлений в избранное и списки покупок, появившихся после прошлого
+    пересчёта, по `id` рецептов. Сдвигает учтённые `id` в `state`.
+    `id` выдаются до фиксации транзакции, поэтому строки с меньшим `id`
+    могут появиться после пересчёта. Пропущенные `id` в последних
+    `RECIPE_RANK_GAP_WINDOW` запоминаются и проверяются при следующих
+    пересчётах, пока не пройдёт `RECIPE_RANK_GAP_TIMEOUT` секунд. Каждая
+    строка учитывается один раз.
+    """
+    increments = defaultdict(float)
+    timestamp = now.timestamp()
+    for model, weight, last_id_field, gaps_field in get_rank_sources():
+        last_id = getattr(state, last_id_field)
+        gaps = {
+            gap_id: seen_at for gap_id, seen_at in getattr(state, gaps_field)
+            if seen_at + settings.RECIPE_RANK_GAP_TIMEOUT > timestamp
+        }
+        max_id = model.objects.aggregate(max_id=Max('id'))['max_id']
+        max_id = max(max_id or 0, last_id)
+        window_start = max(last_id, max_id - settings.RECIPE_RANK_GAP_WINDOW)
+        rows = model.objects.filter(
+            id__gt=last_id, id__lte=window_start
+        ).order_by().values('recipe').annotate(count=Count('id'))
+        for row in rows:
+            increments[row['recipe']] += weight * row['count']
+        found = set()
+        rows = model.objects.filter(
+            Q(id__gt=window_start, id__lte=max_id) | Q(id__in=list(gaps))
+        ).values_list('id', 'recipe')
+        for row_id, recipe_id in rows:
+            increments[recipe_id] += weight
+            found.add(row_id)
+        for gap_id in range(window_start + 1, max_id + 1):
+            gaps.setdefault(gap_id, timestamp)
+        setattr(state, last_id_field, max_id)
+        setattr(state, gaps_field, [
+            [gap_id, seen_at] for gap_id, seen_at in sorted(gaps.items())
+            if gap_id not in found
+        ])
+    return increments
+
+
+def get_popularity():
+    return Subquery(
+        Recipe.objects.filter(pk=OuterRef('recipe')).values(
+            score=(
+                F('favorites_count') * settings.RECIPE_RANK_FAVORITE_WEIGHT
+                + F('shopping_carts_count')
+                * settings.RECIPE_RANK_SHOPPING_CART_WEIGHT
+            )
+        )[:1]
+    )
+
+
+@transaction.atomic
+def refresh_recipe_ranks():
+    """
+    Пересчитывает рейтинги рецептов с новыми добавлениями и удалениями.
+    `trending` увеличивается на вес добавлений, появившихся после прошлого
+    пересчёта, умноженный на `2 ** ((now - trending_epoch) / half_life)`;
+    время добавления считается равным времени пересчёта. `popularity`
+    вычисляется по счётчикам рецепта только для рецептов с новыми
+    добавлениями и помеченных `stale`. Остальные строки не изменяются.
+    Возвращает количество рецептов с новыми добавлениями.
+    """
+    now = timezone.now()
+    state = RecipeRankState.objects.select_for_update().first()
+    if state is None:
+        state = RecipeRankState.objects.create()
+    if state.trending_epoch is None:
+        state.trending_epoch = now
+    exponent = (
+        (now - state.trending_epoch).total_seconds()
+        / settings.RECIPE_TRENDING_HALF_LIFE
+    )
+    if exponent > TRENDING_REBASE_EXPONENT:
+        RecipeRank.objects.update(trending=F('trending') * 0.5 ** exponent)
+        state.trending_epoch = now
+        exponent = 0
+    scale = 2 ** exponent
+    increments = _collect_increments(state, now)
+    updated = 0
+    for batch in batches(increments):
+        RecipeRank.objects.bulk_create(
+            (
+                RecipeRank(recipe_id=recipe_id)
+                for recipe_id in Recipe.objects.filter(
+                    pk__in=batch, rank__isnull=True
+                ).values_list('id', flat=True)
+            ),
+            ignore_conflicts=True
+        )
+        ranks = list(RecipeRank.objects.filter(recipe_id__in=batch))
+        for rank in ranks:
+            rank.trending += increments[rank.recipe_id] * scale
+        RecipeRank.objects.bulk_update(ranks, ('trending',))
+        RecipeRank.objects.filter(recipe_id__in=batch).update(
+            popularity=get_popularity(), stale=False
+        )
+        updated += len(ranks)
+    RecipeRank.objects.filter(stale=True).update(
+        popularity=get_popularity(), stale=False
+    )
+    state.refreshed_at = now
+    state.save()
+    return updated
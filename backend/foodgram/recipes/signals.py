@@ -0,0 +1,83 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import Signal, receiver
+
+from recipes.counters import change_counter, get_counters
+from recipes.models import Favorites, RecipeRank, ShoppingCart
+
+# Отправляется после массовой загрузки объектов модели `sender` в обход
+# `save()`, когда сигналы `post_save` не отправляются. `count` - количество
+# прочитанных строк.
+data_loaded = Signal()
+
+
+class CounterReceivers:
+    """
+    Обновляет счётчик `field` модели `model` при создании и удалении
+    объектов `related_model` (в том числе из админки и каскадном удалении)
+    и при смене связи `related_field`.
+    """
+
+    def __init__(self, model, field, related_model, related_field):
+        self.model = model
+        self.field = field
+        self.related_field = related_field
+        self.attname = related_model._meta.get_field(related_field).attname
+        self.previous_key = f'_previous_{field}_{self.attname}'
+        uid = f'{model.__name__}.{field}'
+        pre_save.connect(
+            self.pre_save, sender=related_model, weak=False, dispatch_uid=uid
+        )
+        post_save.connect(
+            self.post_save, sender=related_model, weak=False, dispatch_uid=uid
+        )
+        post_delete.connect(
+            self.post_delete,
+            sender=related_model,
+            weak=False,
+            dispatch_uid=uid
+        )
+
+    def change(self, pk, delta):
+        if pk is not None:
+            change_counter(self.model, pk, self.field, delta)
+
+    def pre_save(self, sender, instance, raw=False, update_fields=None,
+                 **kwargs):
+        if raw or instance._state.adding or (
+            update_fields is not None
+            and self.related_field not in update_fields
+        ):
+            return
+        instance.__dict__[self.previous_key] = sender.objects.filter(
+            pk=instance.pk
+        ).values_list(self.attname, flat=True).first()
+
+    def post_save(self, sender, instance, created, raw=False, **kwargs):
+        if raw:
+            return
+        current = getattr(instance, self.attname)
+        if created:
+            self.change(current, 1)
+            return
+        previous = instance.__dict__.pop(self.previous_key, current)
+        if previous != current:
+            self.change(previous, -1)
+            self.change(current, 1)
+
+    def post_delete(self, sender, instance, **kwargs):
+        self.change(getattr(instance, self.attname), -1)
+
+
+counter_receivers = [CounterReceivers(*counter) for counter in get_counters()]
+
+
+@receiver(post_delete, sender=Favorites)
+@receiver(post_delete, sender=ShoppingCart)
+def rank_source_deleted(sender, instance, **kwargs):
+    """
+    Помечает рейтинг рецепта для пересчёта `popularity`: удаления не
+    видны по отметке последнего `id` (см. `refresh_recipe_ranks`).
+    """
+    RecipeRank.objects.filter(
+        recipe_id=instance.recipe_id, stale=False
+    ).update(stale=True)
@@ -0,0 +1,45 @@
+import hashlib
+import os
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+
+
+class ContentHashStorage(FileSystemStorage):
+    """
+    Хранилище, в котором имя файла - SHA-256 его содержимого:
+    `<каталог>/<первые два символа хэша>/<хэш><расширение>`.
+    Одинаковое содержимое сохраняется один раз (у существующего файла
+    обновляется время изменения), содержимое не изменяется после записи,
+    поэтому файлы могут кэшироваться навсегда. Файлы не удаляются при
+    смене изображения, т.к. могут использоваться несколькими объектами;
+    неиспользуемые удаляет команда `collect_media_garbage`.
+    """
+
+    def get_hashed_name(self, name, content):
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content.seek(0)
+        hexdigest = digest.hexdigest()
+        directory, filename = os.path.split(name)
+        extension = os.path.splitext(filename)[1].lower()
+        return os.path.join(
+            directory, hexdigest[:2], f'{hexdigest}{extension}'
+        ).replace('\\', '/')
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = self.get_hashed_name(name, content)
+        if self.exists(name):
+            # Время изменения обновляется, чтобы `collect_media_garbage` не
+            # удалил снова используемый файл как старый неиспользуемый.
+            try:
+                os.utime(self.path(name))
+                return name
+            except FileNotFoundError:
+                pass
+        return super().save(name, content, max_length=max_length)
@@ -0,0 +1,276 @@
+import io
+import random
+
+from datetime import timedelta
+from itertools import accumulate
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+from PIL import Image
+
+from recipes.counters import reconcile_counters
+from recipes.models import (
+    Favorites, Ingredient, IngredientAmount, Recipe, RecipeTags, ShoppingCart,
+    Tag,
+)
+from users.models import Follow
+
+User = get_user_model()
+
+DEFAULT_TAGS = (
+    ('Завтрак', '#E26C2D', 'breakfast'),
+    ('Обед', '#49B64E', 'lunch'),
+    ('Ужин', '#8775D2', 'dinner'),
+    ('Десерт', '#C2185B', 'dessert'),
+    ('Выпечка', '#F9A825', 'bakery'),
+    ('Суп', '#0288D1', 'soup'),
+    ('Салат', '#7CB342', 'salad'),
+    ('Закуска', '#6D4C41', 'snack'),
+    ('Напиток', '#00897B', 'drink'),
+    ('Вегетарианское', '#558B2F', 'vegetarian'),
+)
+SYNTHETIC_PASSWORD = 'synthetic-password'
+SYNTHETIC_IMAGE = 'recipes/synthetic.png'
+SYNTHETIC_IMAGE_SIZE = (600, 400)
+SYNTHETIC_IMAGE_COLOR = '#E0E0E0'
+# Даты публикации рецептов равномерно распределены по этому периоду.
+PUB_DATE_PERIOD = timedelta(days=365 * 2)
+USERNAME_PREFIX = 'synthetic'
+ZIPF_EXPONENT = 1.1
+
+
+class ZipfSampler:
+    """
+    Выбирает элементы `population` с вероятностью, обратно пропорциональной
+    степени `exponent` их ранга. Ранги задаются перемешиванием `population`
+    генератором `rng`, поэтому популярные элементы разные при разных `seed`.
+    """
+
+    def __init__(self, rng, population, exponent=ZIPF_EXPONENT):
+        self.rng = rng
+        self.population = list(population)
+        rng.shuffle(self.population)
+        self.cum_weights = list(accumulate(
+            1 / rank ** exponent
+            for rank in range(1, len(self.population) + 1)
+        ))
+
+    def sample(self, count, exclude=None):
+        """До `count` разных элементов, кроме `exclude`."""
+        count = min(count, len(self.population) - (exclude is not None))
+        chosen = set()
+        # Хвост распределения редкий, поэтому число попыток ограничено.
+        for _ in range(count * 10):
+            if len(chosen) >= count:
+                break
+            item = self.rng.choices(
+                self.population, cum_weights=self.cum_weights
+            )[0]
+            if item != exclude:
+                chosen.add(item)
+        return sorted(chosen)
+
+
+def _activity(rng, mean, limit):
+    """Количество действий пользователя: экспоненциальное со средним `mean`."""
+    if mean <= 0:
+        return 0
+    return min(int(rng.expovariate(1 / mean)), limit)
+
+
+def _batches(count, batch_size):
+    for start in range(0, count, batch_size):
+        yield range(start, min(start + batch_size, count))
+
+
+def _new_ids(model, after_id):
+    """`id` объектов, созданных после `after_id`, в порядке создания."""
+    return list(
+        model.objects.filter(pk__gt=after_id).order_by('pk')
+        .values_list('pk', flat=True)
+    )
+
+
+def _last_id(model):
+    last = model.objects.order_by('-pk').values_list('pk', flat=True).first()
+    return last or 0
+
+
+def create_users(seed, count, batch_size):
+    """
+    Создаёт `count` пользователей `synthetic<seed>_<номер>` с общим паролем
+    `SYNTHETIC_PASSWORD`.
+    """
+    prefix = f'{USERNAME_PREFIX}{seed}_'
+    if User.objects.filter(username__startswith=prefix).exists():
+        raise ValueError(f'Данные с seed={seed} уже созданы')
+    password = make_password(SYNTHETIC_PASSWORD)
+    after_id = _last_id(User)
+    for batch in _batches(count, batch_size):
+        User.objects.bulk_create(
+            User(
+                username=f'{prefix}{number}',
+                email=f'{prefix}{number}@example.com',
+                first_name=f'Имя{number}',
+                last_name=f'Фамилия{number}',
+                password=password,
+            )
+            for number in batch
+        )
+    return _new_ids(User, after_id)
+
+
+def create_image():
+    """
+    Сохраняет изображение-заглушку для рецептов и возвращает его имя в
+    хранилище. Содержимое не зависит от запуска, поэтому файл один.
+    """
+    buffer = io.BytesIO()
+    Image.new('RGB', SYNTHETIC_IMAGE_SIZE, SYNTHETIC_IMAGE_COLOR).save(
+        buffer, 'PNG'
+    )
+    return default_storage.save(
+        SYNTHETIC_IMAGE, ContentFile(buffer.getvalue())
+    )
+
+
+def get_tags():
+    """`id` тэгов; если тэгов нет, создаёт `DEFAULT_TAGS`."""
+    if not Tag.objects.exists():
+        Tag.objects.bulk_create(
+            Tag(name=name, color=color, slug=slug)
+            for name, color, slug in DEFAULT_TAGS
+        )
+    return list(Tag.objects.order_by('pk').values_list('pk', flat=True))
+
+
+def create_recipes(rng, count, authors, tags, ingredients, image,
+                   batch_size):
+    """
+    Создаёт `count` рецептов: авторы и ингредиенты распределены по Ципфу,
+    у рецепта 1-3 тэга и 3-12 ингредиентов. Даты публикации растут с `id`
+    и равномерно распределены по `PUB_DATE_PERIOD` до текущего момента.
+    """
+    # `pub_date` заполняется при сохранении (`auto_now`), поэтому даты
+    # задаются отдельным обновлением после вставки.
+    first_pub_date = timezone.now() - PUB_DATE_PERIOD
+    pub_date_step = PUB_DATE_PERIOD / max(count, 1)
+    authors = ZipfSampler(rng, authors)
+    tags = ZipfSampler(rng, tags)
+    ingredients = ZipfSampler(rng, ingredients)
+    recipe_ids = []
+    for batch in _batches(count, batch_size):
+        after_id = _last_id(Recipe)
+        Recipe.objects.bulk_create(
+            Recipe(
+                author_id=authors.sample(1)[0],
+                name=f'Рецепт {number}',
+                text=f'Описание рецепта {number}',
+                image=image,
+                cooking_time=rng.randint(5, 180),
+            )
+            for number in batch
+        )
+        batch_ids = _new_ids(Recipe, after_id)
+        Recipe.objects.bulk_update(
+            (
+                Recipe(
+                    pk=recipe_id,
+                    pub_date=first_pub_date + pub_date_step * number
+                )
+                for recipe_id, number in zip(batch_ids, batch)
+            ),
+            ('pub_date',),
+            batch_size=batch_size
+        )
+        RecipeTags.objects.bulk_create(
+            RecipeTags(recipe_id=recipe_id, tag_id=tag_id)
+            for recipe_id in batch_ids
+            for tag_id in tags.sample(rng.randint(1, 3))
+        )
+        IngredientAmount.objects.bulk_create(
+            IngredientAmount(
+                recipe_id=recipe_id,
+                ingredient_id=ingredient_id,
+                amount=rng.randint(1, 500),
+            )
+            for recipe_id in batch_ids
+            for ingredient_id in ingredients.sample(
+                round(rng.triangular(3, 12, 6))
+            )
+        )
+        recipe_ids.extend(batch_ids)
+    return recipe_ids
+
+
+def create_links(rng, model, field, users, targets, mean, batch_size,
+                 limit=500):
+    """
+    Создаёт связи пользователей с `targets` через поле `field` модели
+    `model`: количество у пользователя в среднем `mean`, цели распределены
+    по Ципфу. Возвращает количество созданных связей.
+    """
+    sampler = ZipfSampler(rng, targets)
+    exclude_self = field == 'author'
+    created = 0
+    for batch in _batches(len(users), batch_size):
+        objs = [
+            model(user_id=users[index], **{f'{field}_id': target})
+            for index in batch
+            for target in sampler.sample(
+                _activity(rng, mean, limit),
+                exclude=users[index] if exclude_self else None,
+            )
+        ]
+        model.objects.bulk_create(objs, batch_size=batch_size)
+        created += len(objs)
+    return created
+
+
+def generate(users=1000, recipes=10000, favorites=20, shopping_carts=5,
+             follows=10, seed=0, batch_size=1000, log=None):
+    """
+    Наполняет базу синтетическими данными, одинаковыми при одном `seed`.
+    `favorites`, `shopping_carts` и `follows` - среднее количество добавлений
+    в избранное, списки покупок и подписок на пользователя.
+    Ингредиенты должны быть загружены заранее командой `filling`.
+    Возвращает количество созданных объектов по моделям.
+    """
+    log = log or (lambda message: None)
+    rng = random.Random(seed)
+    ingredients = list(
+        Ingredient.objects.order_by('pk').values_list('pk', flat=True)
+    )
+    if not ingredients:
+        raise ValueError(
+            'Нет ингредиентов, загрузите их командой `filling`'
+        )
+    created = {}
+    image = create_image()
+    log(f'image: {image}')
+    with transaction.atomic():
+        tags = get_tags()
+        user_ids = create_users(seed, users, batch_size)
+        created['users'] = len(user_ids)
+        log(f'users: {len(user_ids)}')
+        recipe_ids = create_recipes(
+            rng, recipes, user_ids, tags, ingredients, image, batch_size
+        )
+        created['recipes'] = len(recipe_ids)
+        log(f'recipes: {len(recipe_ids)}')
+        for name, model, field, targets, mean in (
+            ('favorites', Favorites, 'recipe', recipe_ids, favorites),
+            ('shopping_carts', ShoppingCart, 'recipe', recipe_ids,
+             shopping_carts),
+            ('follows', Follow, 'author', user_ids, follows),
+        ):
+            created[name] = create_links(
+                rng, model, field, user_ids, targets, mean, batch_size
+            )
+            log(f'{name}: {created[name]}')
+        reconcile_counters()
+    return created
@@ -0,0 +1,101 @@
+import csv
+import json
+import os
+import tempfile
+
+from unittest import skipUnless
+
+from django.conf import settings
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from recipes.management.commands.filling import CopyStream, insert_data
+from recipes.models import Ingredient
+
+DATA_DIR = settings.BASE_DIR.parent.parent
+
+
+class CopyStreamTest(SimpleTestCase):
+    """Колонки `COPY` берутся из модели, а не из первой строки файла."""
+
+    def read(self, rows):
+        stream = CopyStream(rows, Ingredient._meta.concrete_fields)
+        return list(csv.reader(stream.read().splitlines()))
+
+    def test_columns_from_model(self):
+        self.assertEqual(
+            self.read([
+                {'name': 'соль', 'measurement_unit': 'г'},
+                {'measurement_unit': 'шт.', 'name': 'яйцо', 'id': 7},
+                {'name': '', 'measurement_unit': 'г'},
+            ]),
+            [
+                ['\\N', 'соль', 'г'],
+                ['7', 'яйцо', 'шт.'],
+                ['\\N', '', 'г'],
+            ]
+        )
+
+    def test_unknown_column(self):
+        with self.assertRaisesMessage(ValueError, 'calories'):
+            self.read([{'name': 'соль', 'calories': 0}])
+
+
+@skipUnless(connection.vendor == 'postgresql', 'COPY PostgreSQL')
+@override_settings(STATICFILES_DIRS=[DATA_DIR])
+class CopyFillingTest(TestCase):
+    """Файлы из `data/` загружаются через `COPY` так же, как без него."""
+
+    def load(self, file, **kwargs):
+        count = insert_data(Ingredient, file, **kwargs)
+        loaded = set(
+            Ingredient.objects.values_list('name', 'measurement_unit')
+        )
+        return count, loaded
+
+    def test_csv(self):
+        count, loaded = self.load(
+            'ingredients.csv', columns=['name', 'measurement_unit']
+        )
+        with open(os.path.join(DATA_DIR, 'data', 'ingredients.csv'),
+                  encoding='utf_8_sig') as csv_fd:
+            rows = [tuple(row) for row in csv.reader(csv_fd) if row]
+        self.assertEqual(count, len(rows))
+        self.assertEqual(loaded, set(rows))
+
+    def test_json(self):
+        count, loaded = self.load('ingredients.json')
+        with open(os.path.join(DATA_DIR, 'data', 'ingredients.json'),
+                  encoding='utf_8_sig') as json_fd:
+            rows = json.load(json_fd)
+        self.assertEqual(count, len(rows))
+        self.assertEqual(
+            loaded,
+            {(row['name'], row['measurement_unit']) for row in rows}
+        )
+
+    def test_copy_matches_bulk_create(self):
+        _, copied = self.load('ingredients.json')
+        Ingredient.objects.all().delete()
+        _, created = self.load('ingredients.json', use_copy=False)
+        self.assertEqual(copied, created)
+
+    def test_rows_with_and_without_pk(self):
+        rows = [
+            {'name': 'соль', 'measurement_unit': 'г'},
+            {'id': 100000, 'measurement_unit': 'шт.', 'name': 'яйцо'},
+        ]
+        with tempfile.TemporaryDirectory() as base_dir:
+            os.mkdir(os.path.join(base_dir, 'data'))
+            with open(os.path.join(base_dir, 'data', 'rows.json'), 'w',
+                      encoding='utf-8') as json_fd:
+                json.dump(rows, json_fd)
+            with override_settings(STATICFILES_DIRS=[base_dir]):
+                insert_data(Ingredient, 'rows.json')
+        self.assertEqual(Ingredient.objects.get(pk=100000).name, 'яйцо')
+        salt = Ingredient.objects.get(name='соль')
+        self.assertEqual(salt.measurement_unit, 'г')
+        self.assertEqual(
+            Ingredient.objects.create(name='перец', measurement_unit='г').pk,
+            100001
+        )
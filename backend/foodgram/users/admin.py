@@ -10,6 +10,9 @@ User = get_user_model()
 @admin.register(User)
 class CustomUserAdmin(UserAdmin):
     """Админка пользователя."""
+    list_display = UserAdmin.list_display + (
+        'followers_count', 'recipes_count',
+    )
     list_filter = (
         'is_staff', 'is_superuser', 'is_active', 'groups', 'email', 'username'
     )
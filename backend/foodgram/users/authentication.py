@@ -0,0 +1,140 @@
+import copy
+import threading
+import time
+
+from collections import OrderedDict, namedtuple
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.authentication import TokenAuthentication
+
+from api.replication import use_primary
+
+TokenCacheEntry = namedtuple(
+    'TokenCacheEntry', ('fetched_at', 'user', 'token')
+)
+
+
+class TokenCache:
+    """
+    Кэш токен -> (пользователь, токен) в памяти процесса на
+    `TOKEN_AUTH_CACHE_MAX_SIZE` записей, каждая живёт `TOKEN_AUTH_CACHE_TTL`
+    секунд. Если задан `TOKEN_AUTH_SHARED_CACHE`, записи дублируются в
+    общий кэш и используются другими процессами.
+    При выходе и изменении пользователя токен отзывается: сохраняется время
+    отзыва, и записи, полученные раньше, не используются ни в одном
+    процессе. Отметки отзыва хранятся в `TOKEN_AUTH_SHARED_CACHE`, если он
+    задан (иначе отзыв на одном хосте не увидят другие), или в общем для
+    процессов хоста `TOKEN_AUTH_VERSION_CACHE`.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    @staticmethod
+    def _cache_key(prefix, key):
+        return f'token_auth:{prefix}:{key}'
+
+    @staticmethod
+    def _shared_cache():
+        if settings.TOKEN_AUTH_SHARED_CACHE:
+            return caches[settings.TOKEN_AUTH_SHARED_CACHE]
+        return None
+
+    @staticmethod
+    def _revocation_cache():
+        return caches[
+            settings.TOKEN_AUTH_SHARED_CACHE
+            or settings.TOKEN_AUTH_VERSION_CACHE
+        ]
+
+    def _store(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > settings.TOKEN_AUTH_CACHE_MAX_SIZE:
+                self._entries.popitem(last=False)
+
+    def _is_fresh(self, key, entry):
+        if entry.fetched_at + settings.TOKEN_AUTH_CACHE_TTL <= time.time():
+            return False
+        revoked_at = self._revocation_cache().get(
+            self._cache_key('revoked', key)
+        )
+        return revoked_at is None or revoked_at < entry.fetched_at
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+        shared_cache = self._shared_cache()
+        if entry is None and shared_cache is not None:
+            entry = shared_cache.get(self._cache_key('entry', key))
+            if entry is not None:
+                self._store(key, entry)
+        if entry is None or not self._is_fresh(key, entry):
+            return None
+        return entry
+
+    def set(self, key, fetched_at, user, token):
+        """`fetched_at` - время до запроса пользователя из базы."""
+        entry = TokenCacheEntry(fetched_at, user, token)
+        self._store(key, entry)
+        shared_cache = self._shared_cache()
+        if shared_cache is not None:
+            shared_cache.set(
+                self._cache_key('entry', key),
+                entry,
+                settings.TOKEN_AUTH_CACHE_TTL
+            )
+
+    def invalidate(self, *keys):
+        """Отзывает токены `keys` во всех процессах."""
+        if not keys:
+            return
+        revoked_at = time.time()
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+        # Отметка живёт дольше любой записи, полученной до отзыва.
+        self._revocation_cache().set_many(
+            {self._cache_key('revoked', key): revoked_at for key in keys},
+            settings.TOKEN_AUTH_CACHE_TTL + 1
+        )
+        shared_cache = self._shared_cache()
+        if shared_cache is not None:
+            shared_cache.delete_many(
+                [self._cache_key('entry', key) for key in keys]
+            )
+
+
+token_cache = TokenCache()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    `TokenAuthentication`, который берёт пользователя токена из
+    `token_cache` и обращается к базе только при промахе кэша.
+    Каждый запрос получает свою копию пользователя и токена.
+    """
+
+    def authenticate_credentials(self, key):
+        entry = token_cache.get(key)
+        if entry is None:
+            fetched_at = time.time()
+            # Запись кэша живёт `TOKEN_AUTH_CACHE_TTL` секунд, поэтому
+            # токен и пользователь читаются из основной базы: реплика может
+            # ещё не знать о новом токене или деактивации пользователя.
+            with use_primary():
+                user, token = super().authenticate_credentials(key)
+            cached_user = copy.copy(user)
+            cached_token = copy.copy(token)
+            cached_token.user = cached_user
+            token_cache.set(key, fetched_at, cached_user, cached_token)
+            return user, token
+        user = copy.copy(entry.user)
+        token = copy.copy(entry.token)
+        token.user = user
+        return user, token
@@ -8,11 +8,23 @@ class User(AbstractUser):
     Кастомная модель пользователя.
     Изменены свойства поля `email`, т.е. добавлено значение уникальности и
     поле обязательно для заполнения.
+    `followers_count` и `recipes_count` - счётчики подписчиков и рецептов,
+    обновляются сигналами при подписке и публикации рецепта.
     """
     email = models.EmailField(
         'электронная почта',
         unique=True
     )
+    followers_count = models.PositiveIntegerField(
+        'подписчиков',
+        default=0,
+        editable=False
+    )
+    recipes_count = models.PositiveIntegerField(
+        'рецептов',
+        default=0,
+        editable=False
+    )
 
     class Meta:
         ordering = ('-date_joined',)
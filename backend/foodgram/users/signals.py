@@ -0,0 +1,33 @@
+from functools import partial
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from users.authentication import token_cache
+
+User = get_user_model()
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance, **kwargs):
+    """
+    Отзывает кэш токена при выходе пользователя и удалении токена.
+    Отзыв записывается после фиксации транзакции, иначе параллельный
+    запрос может снова закэшировать ещё не удалённый токен.
+    """
+    transaction.on_commit(partial(token_cache.invalidate, instance.key))
+
+
+@receiver(post_save, sender=User)
+def user_changed(sender, instance, update_fields=None, **kwargs):
+    """
+    Отзывает кэш токенов пользователя после фиксации изменения, в том
+    числе деактивации. Обновление `last_login` при входе кэш не затрагивает.
+    """
+    if update_fields is not None and set(update_fields) <= {'last_login'}:
+        return
+    keys = Token.objects.filter(user=instance).values_list('key', flat=True)
+    transaction.on_commit(partial(token_cache.invalidate, *keys))